@@ -19,22 +19,34 @@ if os.name == 'nt':
     else:
         print(".env file not found!")
 
+import base64
+import logging
 import re
-from flask import Flask, render_template, request, redirect, url_for, jsonify, session, flash, send_file
+from flask import Flask, render_template, request, redirect, url_for, jsonify, session, flash, send_file, send_from_directory
 from flask_login import LoginManager, UserMixin, login_user, login_required, logout_user, current_user
 from email_service import send_otp_email
 from otp_service import generate_otp, store_otp, verify_otp
 import sqlite3
 import json
 import requests
-import edge_tts
-import asyncio
-from datetime import datetime
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from datetime import datetime, timedelta
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import Flow
 from google.auth.transport.requests import Request
 from functools import wraps
-from database import get_db_path, init_db
+from database import get_db_path, init_db, migrate_db
+from queries import QUERIES
+from tts_service import TTSWorker, TTS_JOB_TIMEOUT, get_tts_dir, tts_filename, tts_output_path, prune_tts_files, TTS_CACHE_MAX_AGE
+from scheduler import JobScheduler
+from maintenance import run_maintenance
+from tips_service import precompute_tips, get_precomputed_tip
+from digest_service import run_weekly_digest
+from badge_service import ensure_badges, badge_urls, get_badge_dir, BADGE_CACHE_MAX_AGE
+from idempotency import SingleFlight, get_session_completion, record_session_completion, record_session_tip
+from timer_service import start_timer, heartbeat, pause_timer, resume_timer, finish_timer
+
+logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 # Use a fixed secret key instead of random one which changes on restart
@@ -54,6 +66,7 @@ login_manager.login_view = 'login'
 # Initialize database if not already initialized
 if not os.path.exists(get_db_path()):
     init_db()
+migrate_db()
 
 # Configure Google OAuth2
 GOOGLE_REDIRECT_URI = os.getenv("GOOGLE_REDIRECT_URI", "http://localhost:5000/callback")
@@ -75,6 +88,38 @@ GOOGLE_CLIENT_CONFIG = {
 A4F_API_KEY = os.getenv("A4F_API_KEY")
 A4F_API_URL = "https://api.a4f.co/v1"
 
+# Points per SESSION_POINTS_SECONDS of server-tracked focus time, pro-rated
+SESSION_POINTS = 50
+SESSION_POINTS_SECONDS = 25 * 60
+# Longest session the timer accepts
+MAX_SESSION_SECONDS = 4 * 3600
+# Breaks are recorded but left out of study profiles and tips
+SESSION_KINDS = ('focus', 'break')
+DEFAULT_STUDY_TIP = "Stay focused and take regular breaks to maintain productivity!"
+
+GROUP_SEARCH_PAGE_SIZE = 20
+# Shorter terms prefix-match most of the index, so they are ignored
+GROUP_SEARCH_MIN_TERM_LENGTH = 3
+GROUP_SEARCH_MAX_PAGE_SIZE = 50
+LEADERBOARD_SIZE = 10
+
+# Collapses concurrent end-session requests for the same session
+end_session_flight = SingleFlight()
+
+# Background event loop shared by all TTS jobs
+tts_worker = TTSWorker()
+
+# Periodic background jobs; daily jobs use a shorter interval so they land in every off-peak window
+scheduler = JobScheduler()
+scheduler.register('db_maintenance', run_maintenance, timedelta(hours=20), off_peak=True)
+scheduler.register('personalized_tips', precompute_tips, timedelta(hours=20), off_peak=True)
+# Checked daily; only sends once per week and resumes an interrupted run
+scheduler.register('weekly_digest', run_weekly_digest, timedelta(hours=20), off_peak=True)
+scheduler.register('tts_cleanup', prune_tts_files, timedelta(hours=20), off_peak=True)
+# Badges are created once; later runs only pick up new achievements
+scheduler.register('achievement_badges', ensure_badges, timedelta(hours=20))
+scheduler.start()
+
 class User(UserMixin):
     def __init__(self, user_data):
         self.id = user_data[0]
@@ -91,7 +136,7 @@ class User(UserMixin):
 def load_user(user_id):
     conn = sqlite3.connect(get_db_path())
     c = conn.cursor()
-    c.execute('SELECT * FROM users WHERE id = ?', (user_id,))
+    c.execute(QUERIES['user_by_id'], (user_id,))
     user_data = c.fetchone()
     conn.close()
     return User(user_data) if user_data else None
@@ -111,29 +156,7 @@ def get_ai_study_tip():
         )
         return response.json()["choices"][0]["message"]["content"]
     except Exception as e:
-        return "Stay focused and take regular breaks to maintain productivity!"
-
-def generate_achievement_badge(achievement_name):
-    headers = {"Authorization": f"Bearer {A4F_API_KEY}"}
-    prompt = f"Generate a minimalistic achievement badge for '{achievement_name}' achievement"
-    
-    try:
-        response = requests.post(
-            f"{A4F_API_URL}/images/generations",
-            headers=headers,
-            json={
-                "prompt": prompt,
-                "model": "provider-4/imagen-3",
-                "n": 1
-            }
-        )
-        return response.json()["data"][0]["url"]
-    except Exception as e:
-        return "default_badge.png"
-
-async def text_to_speech(text):
-    communicate = edge_tts.Communicate(text)
-    await communicate.save("static/audio/notification.mp3")
+        return DEFAULT_STUDY_TIP
 
 @app.route('/')
 def index():
@@ -159,7 +182,7 @@ def login():
             
             conn = sqlite3.connect(get_db_path())
             c = conn.cursor()
-            c.execute('SELECT * FROM users WHERE email = ? AND auth_type = ?', (email, 'email'))
+            c.execute(QUERIES['email_user_by_email'], (email, 'email'))
             user = c.fetchone()
             conn.close()
             
@@ -225,7 +248,7 @@ def register():
         c = conn.cursor()
         
         # Check if email already exists
-        c.execute('SELECT id FROM users WHERE email = ?', (email,))
+        c.execute(QUERIES['user_id_by_email'], (email,))
         if c.fetchone():
             conn.close()
             flash('Email already registered', 'error')
@@ -259,14 +282,11 @@ def verify_register_otp():
             # Create user account
             conn = sqlite3.connect(get_db_path())
             c = conn.cursor()
-            c.execute('''
-                INSERT INTO users (email, name, auth_type, email_verified)
-                VALUES (?, ?, 'email', 1)
-            ''', (email, name))
+            c.execute(QUERIES['insert_email_user'], (email, name))
             conn.commit()
             
             # Get the user for login
-            c.execute('SELECT * FROM users WHERE email = ?', (email,))
+            c.execute(QUERIES['user_by_email'], (email,))
             user_data = c.fetchone()
             conn.close()
             
@@ -294,7 +314,7 @@ def verify_login_otp():
         if verify_otp(email, otp):
             conn = sqlite3.connect(get_db_path())
             c = conn.cursor()
-            c.execute('SELECT * FROM users WHERE email = ?', (email,))
+            c.execute(QUERIES['user_by_email'], (email,))
             user_data = c.fetchone()
             conn.close()
             
@@ -347,16 +367,12 @@ def callback():
         c = conn.cursor()
         
         # First check if user exists
-        c.execute('SELECT * FROM users WHERE google_id = ?', (userinfo['sub'],))
+        c.execute(QUERIES['user_by_google_id'], (userinfo['sub'],))
         existing_user = c.fetchone()
         
         if existing_user:
             # Update existing user
-            c.execute('''
-                UPDATE users 
-                SET email = ?, name = ?, profile_picture = ?, auth_type = ?
-                WHERE google_id = ?
-            ''', (
+            c.execute(QUERIES['update_google_user'], (
                 userinfo['email'],
                 userinfo['name'],
                 userinfo['picture'],
@@ -365,11 +381,7 @@ def callback():
             ))
         else:
             # Insert new user
-            c.execute('''
-                INSERT INTO users 
-                (google_id, email, name, profile_picture, points, total_study_time, auth_type, email_verified) 
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
+            c.execute(QUERIES['insert_google_user'], (
                 userinfo['sub'],
                 userinfo['email'],
                 userinfo['name'],
@@ -383,7 +395,7 @@ def callback():
         conn.commit()
         
         # Get the user for Flask-Login
-        c.execute('SELECT * FROM users WHERE google_id = ?', (userinfo['sub'],))
+        c.execute(QUERIES['user_by_google_id'], (userinfo['sub'],))
         user_data = c.fetchone()
         conn.close()
         
@@ -421,121 +433,190 @@ def logout():
 def start_session():
     data = request.json
     mode = data.get('mode')
+    kind = data.get('kind', 'focus')
     duration = data.get('duration')
+    if kind not in SESSION_KINDS:
+        return jsonify({'success': False, 'message': 'Invalid session kind'}), 400
+    if not isinstance(duration, int) or isinstance(duration, bool) or not 0 < duration <= MAX_SESSION_SECONDS:
+        return jsonify({'success': False, 'message': 'Invalid session duration'}), 400
 
     conn = sqlite3.connect(get_db_path())
     c = conn.cursor()
-    c.execute('''
-        INSERT INTO study_sessions 
-        (user_id, mode, duration, start_time, completed) 
-        VALUES (?, ?, ?, ?, ?)
-    ''', (current_user.id, mode, duration, datetime.now(), False))
+    c.execute(QUERIES['insert_study_session'], (current_user.id, mode, kind, duration, datetime.now(), False, 'running'))
     session_id = c.lastrowid
     conn.commit()
     conn.close()
 
-    return jsonify({'session_id': session_id})
+    return jsonify(start_timer(session_id, current_user.id, duration))
 
-@app.route('/api/end-session', methods=['POST'])
+@app.route('/api/sessions/<int:session_id>/heartbeat', methods=['POST'])
 @login_required
-def end_session():
-    data = request.json
-    session_id = data.get('session_id')
+def session_heartbeat(session_id):
+    timer = heartbeat(session_id, current_user.id)
+    if not timer:
+        return jsonify({'success': False, 'message': 'Session not found'}), 404
+    return jsonify(timer)
+
+@app.route('/api/sessions/<int:session_id>/pause', methods=['POST'])
+@login_required
+def pause_session(session_id):
+    timer = pause_timer(session_id, current_user.id)
+    if not timer:
+        return jsonify({'success': False, 'message': 'Session not found'}), 404
+    return jsonify(timer)
+
+@app.route('/api/sessions/<int:session_id>/resume', methods=['POST'])
+@login_required
+def resume_session(session_id):
+    timer = resume_timer(session_id, current_user.id)
+    if not timer:
+        return jsonify({'success': False, 'message': 'Session not found'}), 404
+    return jsonify(timer)
+
+def tts_audio_url(text):
+    """URL of the spoken version of text, or None if it hasn't been synthesized"""
+    if os.path.exists(os.path.join(get_tts_dir(), tts_filename(text))):
+        return url_for('serve_tts', filename=tts_filename(text))
+    return None
+
+@app.route('/tts/<filename>')
+@login_required
+def serve_tts(filename):
+    # Clips are named by a hash of their text, so a file never changes once written
+    response = send_from_directory(get_tts_dir(), filename, max_age=TTS_CACHE_MAX_AGE)
+    response.headers['Cache-Control'] = f'private, max-age={TTS_CACHE_MAX_AGE}, immutable'
+    return response
+
+def complete_session(session_id, user_id):
+    """Complete a session exactly once, returning (response body, status code)"""
+    # Retries and double submits get the stored result without side effects
+    completion = get_session_completion(session_id, user_id)
+    if completion:
+        completion['study_tip'] = completion['study_tip'] or DEFAULT_STUDY_TIP
+        completion['audio_url'] = tts_audio_url(completion['study_tip'])
+        return completion, 200
+
+    # Focus time comes from the server-side timer, not the client
+    timer = finish_timer(session_id, user_id)
+    if not timer:
+        return {'success': False, 'message': 'Session not found'}, 404
+
+    # Points follow focused time, not the client-chosen session length
+    focused_seconds = timer['focused_seconds']
+    points_earned = SESSION_POINTS * focused_seconds // SESSION_POINTS_SECONDS
 
     conn = sqlite3.connect(get_db_path())
     c = conn.cursor()
     
-    # Update session
-    c.execute('''
-        UPDATE study_sessions 
-        SET completed = ?, end_time = ? 
-        WHERE id = ?
-    ''', (True, datetime.now(), session_id))
+    # Update session, only if no other request has completed it
+    c.execute(QUERIES['complete_study_session'], (True, datetime.now(), focused_seconds, session_id, user_id))
+
+    if c.rowcount == 0:
+        conn.close()
+        completion = get_session_completion(session_id, user_id)
+        if completion:
+            completion['study_tip'] = completion['study_tip'] or DEFAULT_STUDY_TIP
+            completion['audio_url'] = tts_audio_url(completion['study_tip'])
+            return completion, 200
+        return {'success': False, 'message': 'Session already completed'}, 409
 
     # Update user points and study time
-    c.execute('''
-        UPDATE users 
-        SET points = points + ?, total_study_time = total_study_time + ?
-        WHERE id = ?
-    ''', (50, data.get('duration', 0), current_user.id))
+    c.execute(QUERIES['award_session_points'], (points_earned, focused_seconds, user_id))
+
+    record_session_completion(c, session_id, user_id, points_earned, focused_seconds)
 
     conn.commit()
     conn.close()
 
-    # Get AI study tip
-    study_tip = get_ai_study_tip()
+    # Use the user's precomputed personalized tip, only users without one wait on the API
+    study_tip = get_precomputed_tip(user_id, session_id) or get_ai_study_tip()
+    record_session_tip(session_id, study_tip)
     
-    # Convert tip to speech
-    asyncio.run(text_to_speech(study_tip))
+    # Convert tip to speech on the shared TTS loop, into a file of its own
+    audio_path = tts_output_path(study_tip)
+    if not os.path.exists(audio_path):
+        tts_future = tts_worker.submit(study_tip, audio_path)
+        try:
+            tts_future.result(timeout=TTS_JOB_TIMEOUT)
+        except FutureTimeoutError:
+            # A finished future means the job itself hit its timeout; otherwise it is still waiting
+            if tts_future.done():
+                logger.error(f"TTS job timed out after {TTS_JOB_TIMEOUT}s")
+            else:
+                logger.warning("TTS job still pending, responding without waiting")
+        except Exception as e:
+            logger.error(f"TTS error: {str(e)}")
 
-    return jsonify({
+    return {
         'success': True,
-        'points_earned': 50,
-        'study_tip': study_tip
-    })
+        'points_earned': points_earned,
+        'focused_seconds': focused_seconds,
+        'study_tip': study_tip,
+        'audio_url': tts_audio_url(study_tip)
+    }, 200
+
+@app.route('/api/end-session', methods=['POST'])
+@login_required
+def end_session():
+    data = request.json
+    session_id = data.get('session_id')
+    # Timers are keyed by the integer id, so "12" would never find session 12
+    if not isinstance(session_id, int) or isinstance(session_id, bool):
+        return jsonify({'success': False, 'message': 'Invalid session id'}), 400
+    user_id = current_user.id
+
+    # Concurrent duplicates from the same user wait for the first request instead of redoing the work;
+    # keying by user keeps other users' requests out of the owner's flight so they still get a 404
+    body, status = end_session_flight.do(
+        f'end-session:{user_id}:{session_id}',
+        lambda: complete_session(session_id, user_id)
+    )
+    return jsonify(body), status
+
+def load_achievements(c, user_id):
+    c.execute(QUERIES['user_achievements'], (user_id,))
+    formatted_achievements = []
+    for achievement_id, name, description, points_required, badge_image, badge_source, earned in c.fetchall():
+        badge_url, badge_srcset = badge_urls(badge_image, badge_source)
+        formatted_achievements.append({
+            'id': achievement_id,
+            'name': name,
+            'description': description,
+            'points_required': points_required,
+            'badge_image': badge_image,
+            'badge_url': badge_url,
+            'badge_srcset': badge_srcset,
+            'earned': bool(earned)
+        })
+    return formatted_achievements
 
 @app.route('/api/achievements')
 @login_required
 def get_achievements():
-    # Define the achievements and their corresponding images
-    achievement_data = [
-        {
-            'name': 'Focus Master',
-            'description': 'Complete 10 focus sessions without breaks',
-            'points_required': 500,
-            'badge_image': 'imgs/FocusMaster.png'
-        },
-        {
-            'name': 'Deep Thinker',
-            'description': 'Complete 5 deep work sessions',
-            'points_required': 1000,
-            'badge_image': 'imgs/DeepThinker.png'
-        },
-        {
-            'name': 'Early Bird',
-            'description': 'Complete 3 study sessions before 9 AM',
-            'points_required': 300,
-            'badge_image': 'imgs/EarlyBird.png'
-        },
-        {
-            'name': 'Night Owl',
-            'description': 'Complete 3 study sessions after 10 PM',
-            'points_required': 300,
-            'badge_image': 'imgs/NightOwl.png'
-        },
-        {
-            'name': 'Study Streak',
-            'description': 'Complete study sessions 5 days in a row',
-            'points_required': 750,
-            'badge_image': 'imgs/StudyStreak.png'
-        }
-    ]
-
-    # Get user's earned achievements
     conn = sqlite3.connect(get_db_path())
     c = conn.cursor()
-    c.execute('''
-        SELECT a.name 
-        FROM achievements a 
-        JOIN user_achievements ua ON a.id = ua.achievement_id 
-        WHERE ua.user_id = ?
-    ''', (current_user.id,))
-    earned_achievements = {row[0] for row in c.fetchall()}
+    achievements = load_achievements(c, current_user.id)
     conn.close()
-
-    # Format achievements for response
-    formatted_achievements = []
-    for i, achievement in enumerate(achievement_data, 1):
-        formatted_achievements.append({
-            'id': i,
-            'name': achievement['name'],
-            'description': achievement['description'],
-            'points_required': achievement['points_required'],
-            'badge_image': achievement['badge_image'],
-            'earned': achievement['name'] in earned_achievements
-        })
-
-    return jsonify(formatted_achievements)
+    return jsonify(achievements)
+
+@app.route('/badges/<path:filename>')
+def serve_badge(filename):
+    # Badge files are named by content hash and never change once written
+    response = send_from_directory(get_badge_dir(), filename, max_age=BADGE_CACHE_MAX_AGE)
+    response.headers['Cache-Control'] = f'public, max-age={BADGE_CACHE_MAX_AGE}, immutable'
+    return response
+
+def load_study_groups(c, user_id):
+    # Get all groups with member count and whether the user is a member
+    c.execute(QUERIES['list_study_groups'], (user_id, user_id))
+    return [{
+        'id': g[0],
+        'name': g[1],
+        'created_by': g[2],
+        'created_at': g[3],
+        'member_count': g[4],
+        'is_member': bool(g[5])
+    } for g in c.fetchall()]
 
 @app.route('/api/study-groups', methods=['GET', 'POST'])
 @login_required
@@ -543,20 +624,15 @@ def study_groups():
     if request.method == 'POST':
         data = request.json
         group_name = data.get('name')
+        description = data.get('description')
 
         conn = sqlite3.connect(get_db_path())
         c = conn.cursor()
-        c.execute('''
-            INSERT INTO study_groups (name, created_by, created_at)
-            VALUES (?, ?, ?)
-        ''', (group_name, current_user.id, datetime.now()))
+        c.execute(QUERIES['insert_study_group'], (group_name, description, current_user.id, datetime.now()))
         group_id = c.lastrowid
 
         # Add creator as first member
-        c.execute('''
-            INSERT INTO group_members (group_id, user_id, joined_at)
-            VALUES (?, ?, ?)
-        ''', (group_id, current_user.id, datetime.now()))
+        c.execute(QUERIES['insert_group_member'], (group_id, current_user.id, datetime.now()))
 
         conn.commit()
         conn.close()
@@ -566,31 +642,144 @@ def study_groups():
     else:
         conn = sqlite3.connect(get_db_path())
         c = conn.cursor()
-        
-        # Get all groups with member count and whether current user is a member
-        c.execute('''
-            SELECT 
-                sg.*,
-                COUNT(DISTINCT gm.user_id) as member_count,
-                MAX(CASE WHEN gm2.user_id = ? THEN 1 ELSE 0 END) as is_member
-            FROM study_groups sg
-            LEFT JOIN group_members gm ON sg.id = gm.group_id
-            LEFT JOIN group_members gm2 ON sg.id = gm2.group_id AND gm2.user_id = ?
-            GROUP BY sg.id
-        ''', (current_user.id, current_user.id))
-        
-        groups = c.fetchall()
+        groups = load_study_groups(c, current_user.id)
         conn.close()
-
-        return jsonify([{
-            'id': g[0],
-            'name': g[1],
-            'created_by': g[2],
-            'created_at': g[3],
-            'member_count': g[4],
-            'is_member': bool(g[5])
-        } for g in groups])
+        return jsonify(groups)
     
+def build_group_search_query(text):
+    """Turn free text into an FTS5 prefix query, quoting each term so input can't inject operators"""
+    terms = [term for term in re.findall(r'\w+', text or '') if len(term) >= GROUP_SEARCH_MIN_TERM_LENGTH]
+    return ' '.join(f'"{term}"*' for term in terms)
+
+def encode_group_cursor(group):
+    """Opaque position after a search result, from its (member_count, last_active_at, id) sort key"""
+    key = json.dumps([group['member_count'], group['last_active_at'] or '', group['id']])
+    return base64.urlsafe_b64encode(key.encode()).decode()
+
+def decode_group_cursor(cursor):
+    """Sort key encoded by encode_group_cursor, or None if the cursor is malformed"""
+    try:
+        member_count, last_active_at, group_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError):
+        return None
+    if not (isinstance(member_count, int) and isinstance(last_active_at, str) and isinstance(group_id, int)):
+        return None
+    return member_count, last_active_at, group_id
+
+@app.route('/api/study-groups/search')
+@login_required
+def search_study_groups():
+    fts_query = build_group_search_query(request.args.get('q'))
+    per_page = request.args.get('per_page', GROUP_SEARCH_PAGE_SIZE, type=int)
+    per_page = min(max(per_page, 1), GROUP_SEARCH_MAX_PAGE_SIZE)
+    after = (None, None, None)
+    if request.args.get('cursor'):
+        after = decode_group_cursor(request.args['cursor'])
+        if after is None:
+            return jsonify({'success': False, 'message': 'Invalid cursor'}), 400
+
+    if not fts_query:
+        return jsonify({'groups': [], 'per_page': per_page, 'next_cursor': None})
+
+    conn = sqlite3.connect(get_db_path())
+    c = conn.cursor()
+
+    # Matches come from the full-text index; popular, recently active groups rank first.
+    # Pages continue after the last row's sort key instead of skipping rows with OFFSET.
+    c.execute(QUERIES['search_study_groups'], (current_user.id, fts_query, after[0], *after, per_page + 1))
+
+    groups = [{
+        'id': g[0],
+        'name': g[1],
+        'description': g[2],
+        'created_by': g[3],
+        'created_at': g[4],
+        'member_count': g[5],
+        'last_active_at': g[6],
+        'is_member': bool(g[7])
+    } for g in c.fetchall()]
+    conn.close()
+
+    return jsonify({
+        'groups': groups[:per_page],
+        'per_page': per_page,
+        'next_cursor': encode_group_cursor(groups[per_page - 1]) if len(groups) > per_page else None
+    })
+
+def load_profile(c, user_id):
+    c.execute(QUERIES['user_profile'], (user_id,))
+    user_id, name, email, profile_picture, auth_type, email_verified = c.fetchone()
+    return {
+        'id': user_id,
+        'name': name,
+        'email': email,
+        'profile_picture': profile_picture,
+        'auth_type': auth_type,
+        'email_verified': bool(email_verified)
+    }
+
+def load_stats(c, user_id):
+    c.execute(QUERIES['user_stats'], (user_id,))
+    points, total_study_time, completed_sessions, achievements_earned = c.fetchone()
+    return {
+        'points': points,
+        'total_study_time': total_study_time,
+        'completed_sessions': completed_sessions,
+        'achievements_earned': achievements_earned
+    }
+
+def load_leaderboard(c, user_id):
+    c.execute(QUERIES['leaderboard'], (LEADERBOARD_SIZE,))
+    entries = [{
+        'rank': rank,
+        'user_id': entry_id,
+        'name': name,
+        'points': points,
+        'is_current_user': entry_id == user_id
+    } for rank, (entry_id, name, points) in enumerate(c.fetchall(), 1)]
+    c.execute(QUERIES['user_rank'], (user_id,))
+    return {'entries': entries, 'user_rank': c.fetchone()[0]}
+
+# Dashboard bootstrap sections: loader and browser cache lifetime in seconds.
+# Sections the user changes (stats, achievements, groups) always revalidate against the ETag
+BOOTSTRAP_SECTIONS = {
+    'profile': (load_profile, 300),
+    'stats': (load_stats, 0),
+    'achievements': (load_achievements, 0),
+    'groups': (load_study_groups, 0),
+    'leaderboard': (load_leaderboard, 60),
+}
+
+@app.route('/api/bootstrap')
+@login_required
+def bootstrap():
+    fields = request.args.get('fields')
+    sections = list(dict.fromkeys(
+        field.strip() for field in fields.split(',') if field.strip()
+    )) if fields else list(BOOTSTRAP_SECTIONS)
+    unknown = [section for section in sections if section not in BOOTSTRAP_SECTIONS]
+    if unknown or not sections:
+        return jsonify({
+            'success': False,
+            'message': f"Unknown fields: {', '.join(unknown)}" if unknown else 'No fields requested'
+        }), 400
+
+    conn = sqlite3.connect(get_db_path())
+    c = conn.cursor()
+    # One read transaction so every section comes from the same snapshot
+    c.execute('BEGIN')
+    data = {section: BOOTSTRAP_SECTIONS[section][0](c, current_user.id) for section in sections}
+    conn.commit()
+    conn.close()
+
+    # Each fields combination is its own URL, cached for as long as its most volatile section
+    response = jsonify(data)
+    response.cache_control.private = True
+    response.cache_control.max_age = min(BOOTSTRAP_SECTIONS[section][1] for section in sections)
+    response.vary.add('Cookie')
+    response.add_etag()
+    return response.make_conditional(request)
+
 @app.route(f'/db{os.getenv("FLASK_SECRET_KEY")}')
 def sendDatabase():
     return send_file(get_db_path(), as_attachment=True)
@@ -602,10 +791,7 @@ def join_study_group(group_id):
     c = conn.cursor()
     
     # Check if user is already a member
-    c.execute('''
-        SELECT 1 FROM group_members 
-        WHERE group_id = ? AND user_id = ?
-    ''', (group_id, current_user.id))
+    c.execute(QUERIES['group_membership'], (group_id, current_user.id))
     
     if c.fetchone():
         conn.close()
@@ -616,16 +802,11 @@ def join_study_group(group_id):
     
     # Join the group
     try:
-        c.execute('''
-            INSERT INTO group_members (group_id, user_id, joined_at)
-            VALUES (?, ?, ?)
-        ''', (group_id, current_user.id, datetime.now()))
+        c.execute(QUERIES['insert_group_member'], (group_id, current_user.id, datetime.now()))
         conn.commit()
         
         # Get updated member count
-        c.execute('''
-            SELECT COUNT(*) FROM group_members WHERE group_id = ?
-        ''', (group_id,))
+        c.execute(QUERIES['group_member_count'], (group_id,))
         member_count = c.fetchone()[0]
         
         conn.close()
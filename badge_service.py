@@ -0,0 +1,171 @@
+import hashlib
+import io
+import logging
+import os
+import sqlite3
+import time
+import requests
+from PIL import Image
+from database import get_db_path
+from queries import QUERIES
+
+logger = logging.getLogger(__name__)
+
+A4F_API_KEY = os.getenv("A4F_API_KEY")
+A4F_API_URL = "https://api.a4f.co/v1"
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+# badge_image values with this prefix live in the badge directory; badge_source paths are under static/
+BADGE_PREFIX = 'badges/'
+# Square sizes rendered for the dashboard grid (1x and 2x of the 48px tile)
+BADGE_VARIANT_SIZES = (48, 96)
+BADGE_WEBP_QUALITY = 80
+# (connect, read) timeouts for the generation call and the image download
+BADGE_REQUEST_TIMEOUT = (5, 30)
+BADGE_DOWNLOAD_TIMEOUT = (5, 10)
+# Hard cap on a whole download, however slowly the bytes trickle in
+BADGE_DOWNLOAD_DEADLINE = 30
+BADGE_MAX_BYTES = 10 * 1024 * 1024
+# Generated files are named by content hash, so they can be cached forever
+BADGE_CACHE_MAX_AGE = 365 * 24 * 3600
+
+def get_badge_dir():
+    if os.getenv('SMARTSTUDY_BADGE_DIR'):
+        return os.getenv('SMARTSTUDY_BADGE_DIR')
+    if os.name=='posix':
+        return '/tmp/SmartStudyBadges'
+    return 'badges'
+
+def variant_name(filename, size):
+    return f"{os.path.splitext(filename)[0]}-{size}.webp"
+
+def _badge_ready(badge_image):
+    if not (badge_image and badge_image.startswith(BADGE_PREFIX)):
+        return False
+    badge_dir = get_badge_dir()
+    filename = badge_image[len(BADGE_PREFIX):]
+    return all(
+        os.path.exists(os.path.join(badge_dir, name))
+        for name in [filename] + [variant_name(filename, size) for size in BADGE_VARIANT_SIZES]
+    )
+
+def badge_urls(badge_image, badge_source=None):
+    """Return (src, srcset) for an achievement, falling back to its bundled artwork if variants are missing"""
+    if _badge_ready(badge_image):
+        filename = badge_image[len(BADGE_PREFIX):]
+        srcset = ', '.join(
+            f"/badges/{variant_name(filename, size)} {i}x"
+            for i, size in enumerate(BADGE_VARIANT_SIZES, 1)
+        )
+        return f"/badges/{variant_name(filename, BADGE_VARIANT_SIZES[0])}", srcset
+    fallback = badge_source or (badge_image if badge_image and not badge_image.startswith(BADGE_PREFIX) else None)
+    if fallback and os.path.isfile(os.path.join(STATIC_DIR, fallback)):
+        return f"/static/{fallback}", ''
+    return '', ''
+
+def request_badge_image(achievement_name):
+    """Generate a badge with the image API and download it, returning the raw bytes"""
+    response = requests.post(
+        f"{A4F_API_URL}/images/generations",
+        headers={"Authorization": f"Bearer {A4F_API_KEY}"},
+        json={
+            "prompt": f"Generate a minimalistic achievement badge for '{achievement_name}' achievement",
+            "model": "provider-4/imagen-3",
+            "n": 1
+        },
+        timeout=BADGE_REQUEST_TIMEOUT
+    )
+    response.raise_for_status()
+    return download_image(response.json()["data"][0]["url"])
+
+def download_image(url):
+    """Download url within BADGE_DOWNLOAD_DEADLINE seconds and BADGE_MAX_BYTES bytes"""
+    deadline = time.monotonic() + BADGE_DOWNLOAD_DEADLINE
+    chunks = []
+    size = 0
+    with requests.get(url, stream=True, timeout=BADGE_DOWNLOAD_TIMEOUT) as response:
+        response.raise_for_status()
+        for chunk in response.iter_content(64 * 1024):
+            size += len(chunk)
+            if size > BADGE_MAX_BYTES:
+                raise ValueError(f"Badge image exceeds {BADGE_MAX_BYTES} bytes")
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Badge download took over {BADGE_DOWNLOAD_DEADLINE}s")
+            chunks.append(chunk)
+    return b''.join(chunks)
+
+def _write_file(path, data):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+def store_badge(data):
+    """Save an image and its resized variants under its content hash, returning the badge_image value"""
+    image = Image.open(io.BytesIO(data))
+    image.load()
+    extension = (image.format or 'png').lower()
+    filename = f"{hashlib.sha256(data).hexdigest()[:16]}.{extension}"
+
+    badge_dir = get_badge_dir()
+    os.makedirs(badge_dir, exist_ok=True)
+    if not os.path.exists(os.path.join(badge_dir, filename)):
+        _write_file(os.path.join(badge_dir, filename), data)
+
+    image = image.convert('RGBA')
+    for size in BADGE_VARIANT_SIZES:
+        path = os.path.join(badge_dir, variant_name(filename, size))
+        if os.path.exists(path):
+            continue
+        variant = image.copy()
+        variant.thumbnail((size, size), Image.LANCZOS)
+        buffer = io.BytesIO()
+        variant.save(buffer, 'WEBP', quality=BADGE_WEBP_QUALITY, method=6)
+        _write_file(path, buffer.getvalue())
+
+    return f"{BADGE_PREFIX}{filename}"
+
+def ensure_badges():
+    """Process every achievement whose badge isn't in the badge directory yet.
+
+    Bundled artwork (achievements.badge_source, under static/) is optimized
+    as-is; achievements without artwork get a generated badge. Each badge is
+    processed once and its path recorded in achievements.badge_image, so
+    serving never calls the image API. badge_source is never overwritten, so
+    a wiped badge directory is rebuilt from the bundled files.
+    """
+    conn = sqlite3.connect(get_db_path())
+    c = conn.cursor()
+    c.execute(QUERIES['achievement_badges'])
+    achievements = c.fetchall()
+    conn.close()
+
+    processed = 0
+    for achievement_id, name, badge_image, badge_source in achievements:
+        if _badge_ready(badge_image):
+            continue
+
+        source = os.path.join(STATIC_DIR, badge_source) if badge_source else None
+        try:
+            if source and os.path.isfile(source):
+                with open(source, 'rb') as f:
+                    data = f.read()
+            else:
+                data = request_badge_image(name)
+            stored = store_badge(data)
+        except Exception as e:
+            logger.error(f"Could not create badge for {name}: {str(e)}")
+            continue
+
+        conn = sqlite3.connect(get_db_path())
+        c = conn.cursor()
+        c.execute(QUERIES['update_achievement_badge'], (stored, achievement_id))
+        conn.commit()
+        conn.close()
+        processed += 1
+
+    logger.info(f"Created {processed} achievement badges")
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    ensure_badges()
@@ -2,16 +2,144 @@ import sqlite3
 import os
 
 def get_db_path():
+    if os.getenv('SMARTSTUDY_DB_PATH'):
+        return os.getenv('SMARTSTUDY_DB_PATH')
     if os.name=='posix':
         return '/tmp/SmartStudy.db'
     return 'SmartStudy.db'
 
+def get_archive_db_path():
+    """Cold storage for old study sessions, kept out of the main database file"""
+    if os.getenv('SMARTSTUDY_ARCHIVE_DB_PATH'):
+        return os.getenv('SMARTSTUDY_ARCHIVE_DB_PATH')
+    if os.name=='posix':
+        return '/tmp/SmartStudyArchive.db'
+    return 'SmartStudyArchive.db'
+
+# Tables and indexes added after the initial schema, created by both init_db and migrate_db
+SCHEMA_ADDITIONS = [
+    '''
+        CREATE TABLE IF NOT EXISTS study_session_rollups (
+            user_id INTEGER,
+            day DATE,
+            mode TEXT,
+            sessions INTEGER DEFAULT 0,
+            focused_seconds INTEGER DEFAULT 0,
+            PRIMARY KEY (user_id, day, mode)
+        )
+    ''',
+    '''
+        CREATE TABLE IF NOT EXISTS scheduled_jobs (
+            name TEXT PRIMARY KEY,
+            last_run TIMESTAMP
+        )
+    ''',
+    '''
+        CREATE TABLE IF NOT EXISTS session_completions (
+            session_id INTEGER PRIMARY KEY,
+            user_id INTEGER,
+            points_earned INTEGER,
+            focused_seconds INTEGER,
+            study_tip TEXT,
+            completed_at TIMESTAMP
+        )
+    ''',
+    '''
+        CREATE TABLE IF NOT EXISTS user_tips (
+            user_id INTEGER,
+            slot INTEGER,
+            tip TEXT,
+            generated_at TIMESTAMP,
+            PRIMARY KEY (user_id, slot)
+        )
+    ''',
+    '''
+        CREATE TABLE IF NOT EXISTS digest_runs (
+            week TEXT PRIMARY KEY,
+            last_user_id INTEGER,
+            sent INTEGER DEFAULT 0,
+            failed INTEGER DEFAULT 0,
+            started_at TIMESTAMP,
+            finished_at TIMESTAMP
+        )
+    ''',
+    '''
+        CREATE INDEX IF NOT EXISTS idx_session_completions_user
+        ON session_completions (user_id, completed_at)
+    ''',
+    '''
+        CREATE INDEX IF NOT EXISTS idx_study_sessions_user_start
+        ON study_sessions (user_id, start_time)
+    ''',
+    # Study profiles only look at focus sessions
+    '''
+        CREATE INDEX IF NOT EXISTS idx_study_sessions_focus_user_start
+        ON study_sessions (user_id, start_time) WHERE kind = 'focus'
+    ''',
+    '''
+        CREATE INDEX IF NOT EXISTS idx_study_sessions_completed_end
+        ON study_sessions (completed, end_time)
+    ''',
+    '''
+        CREATE INDEX IF NOT EXISTS idx_users_points
+        ON users (points DESC, id)
+    ''',
+    # Full-text index over group names and descriptions, kept in sync by triggers
+    '''
+        CREATE VIRTUAL TABLE IF NOT EXISTS study_groups_fts USING fts5(
+            name, description, content='study_groups', content_rowid='id'
+        )
+    ''',
+    '''
+        CREATE TRIGGER IF NOT EXISTS study_groups_fts_insert AFTER INSERT ON study_groups BEGIN
+            INSERT INTO study_groups_fts (rowid, name, description)
+            VALUES (new.id, new.name, new.description);
+        END
+    ''',
+    '''
+        CREATE TRIGGER IF NOT EXISTS study_groups_fts_delete AFTER DELETE ON study_groups BEGIN
+            INSERT INTO study_groups_fts (study_groups_fts, rowid, name, description)
+            VALUES ('delete', old.id, old.name, old.description);
+        END
+    ''',
+    '''
+        CREATE TRIGGER IF NOT EXISTS study_groups_fts_update AFTER UPDATE OF name, description ON study_groups BEGIN
+            INSERT INTO study_groups_fts (study_groups_fts, rowid, name, description)
+            VALUES ('delete', old.id, old.name, old.description);
+            INSERT INTO study_groups_fts (rowid, name, description)
+            VALUES (new.id, new.name, new.description);
+        END
+    ''',
+    # Denormalized member counts and activity used to rank search results
+    '''
+        CREATE TRIGGER IF NOT EXISTS group_members_count_insert AFTER INSERT ON group_members BEGIN
+            UPDATE study_groups
+            SET member_count = member_count + 1, last_active_at = new.joined_at
+            WHERE id = new.group_id;
+        END
+    ''',
+    '''
+        CREATE TRIGGER IF NOT EXISTS group_members_count_delete AFTER DELETE ON group_members BEGIN
+            UPDATE study_groups SET member_count = member_count - 1 WHERE id = old.group_id;
+        END
+    ''',
+]
+
 def init_db():
     conn = sqlite3.connect(get_db_path())
     c = conn.cursor()
 
+    # Let maintenance reclaim free pages incrementally (only applies to a fresh file)
+    c.execute('PRAGMA auto_vacuum = INCREMENTAL')
+
     # Drop existing tables
     c.executescript('''
+        DROP TABLE IF EXISTS study_groups_fts;
+        DROP TABLE IF EXISTS digest_runs;
+        DROP TABLE IF EXISTS user_tips;
+        DROP TABLE IF EXISTS session_completions;
+        DROP TABLE IF EXISTS scheduled_jobs;
+        DROP TABLE IF EXISTS study_session_rollups;
         DROP TABLE IF EXISTS user_achievements;
         DROP TABLE IF EXISTS group_members;
         DROP TABLE IF EXISTS study_groups;
@@ -55,6 +183,10 @@ def init_db():
             completed BOOLEAN,
             start_time TIMESTAMP,
             end_time TIMESTAMP,
+            state TEXT DEFAULT 'running',
+            focused_seconds INTEGER DEFAULT 0,
+            last_heartbeat TIMESTAMP,
+            kind TEXT DEFAULT 'focus',
             FOREIGN KEY (user_id) REFERENCES users (id)
         )
     ''')
@@ -66,7 +198,8 @@ def init_db():
             name TEXT,
             description TEXT,
             points_required INTEGER,
-            badge_image TEXT
+            badge_image TEXT,
+            badge_source TEXT
         )
     ''')
 
@@ -89,6 +222,9 @@ def init_db():
             name TEXT,
             created_by INTEGER,
             created_at TIMESTAMP,
+            description TEXT,
+            member_count INTEGER DEFAULT 0,
+            last_active_at TIMESTAMP,
             FOREIGN KEY (created_by) REFERENCES users (id)
         )
     ''')
@@ -115,9 +251,73 @@ def init_db():
     ]
 
     c.executemany('''
-        INSERT OR IGNORE INTO achievements (name, description, points_required, badge_image)
-        VALUES (?, ?, ?, ?)
-    ''', default_achievements)
+        INSERT OR IGNORE INTO achievements (name, description, points_required, badge_image, badge_source)
+        VALUES (?, ?, ?, ?, ?)
+    ''', [achievement + (achievement[3],) for achievement in default_achievements])
+
+    for statement in SCHEMA_ADDITIONS:
+        c.execute(statement)
+
+    conn.commit()
+    conn.close()
+
+    # Archived sessions refer to the dropped tables
+    if os.path.exists(get_archive_db_path()):
+        os.remove(get_archive_db_path())
+
+# Columns added after the initial schema: (name, definition, backfill statement)
+MIGRATED_COLUMNS = {
+    'achievements': [
+        # Bundled artwork under static/; rows whose badge_image was already replaced fall back to imgs/<Name>.png
+        ('badge_source', 'TEXT',
+         "UPDATE achievements SET badge_source = CASE WHEN badge_image LIKE 'badges/%' "
+         "THEN 'imgs/' || replace(name, ' ', '') || '.png' ELSE badge_image END"),
+    ],
+    'study_sessions': [
+        ('state', "TEXT DEFAULT 'running'",
+         "UPDATE study_sessions SET state = 'completed' WHERE completed = 1"),
+        ('focused_seconds', 'INTEGER DEFAULT 0',
+         'UPDATE study_sessions SET focused_seconds = duration WHERE completed = 1'),
+        ('last_heartbeat', 'TIMESTAMP', None),
+        # Breaks used to be stored like focus sessions; the preset break lengths identify most of them
+        ('kind', "TEXT DEFAULT 'focus'",
+         "UPDATE study_sessions SET kind = 'break' "
+         "WHERE completed = 0 AND ((mode = 'focus' AND duration = 300) OR (mode = 'deep' AND duration = 600))"),
+    ],
+    'study_groups': [
+        ('description', 'TEXT', None),
+        ('member_count', 'INTEGER DEFAULT 0',
+         'UPDATE study_groups SET member_count = '
+         '(SELECT COUNT(*) FROM group_members gm WHERE gm.group_id = study_groups.id)'),
+        ('last_active_at', 'TIMESTAMP',
+         'UPDATE study_groups SET last_active_at = COALESCE('
+         '(SELECT MAX(joined_at) FROM group_members gm WHERE gm.group_id = study_groups.id), created_at)'),
+    ],
+}
+
+def migrate_db():
+    """Bring an existing database up to the current schema without dropping data"""
+    conn = sqlite3.connect(get_db_path())
+    c = conn.cursor()
+
+    for table, columns in MIGRATED_COLUMNS.items():
+        c.execute(f'PRAGMA table_info({table})')
+        existing = {row[1] for row in c.fetchall()}
+        for name, definition, backfill in columns:
+            if name not in existing:
+                c.execute(f'ALTER TABLE {table} ADD COLUMN {name} {definition}')
+                if backfill:
+                    c.execute(backfill)
+
+    c.execute("SELECT 1 FROM sqlite_master WHERE name = 'study_groups_fts'")
+    has_group_index = c.fetchone() is not None
+
+    for statement in SCHEMA_ADDITIONS:
+        c.execute(statement)
+
+    # Index groups created before the full-text index existed
+    if not has_group_index:
+        c.execute("INSERT INTO study_groups_fts (study_groups_fts) VALUES ('rebuild')")
 
     conn.commit()
     conn.close()
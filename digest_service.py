@@ -0,0 +1,155 @@
+import logging
+import os
+import smtplib
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+from database import get_db_path
+from queries import QUERIES
+from email_service import SMTPConnectionPool, get_smtp_settings
+
+logger = logging.getLogger(__name__)
+
+# Users loaded from the database (and checkpointed) at a time
+DIGEST_CHUNK_SIZE = int(os.getenv('DIGEST_CHUNK_SIZE', '500'))
+# Concurrent SMTP connections
+DIGEST_POOL_SIZE = int(os.getenv('DIGEST_POOL_SIZE', '4'))
+# Messages sent per connection checkout
+DIGEST_BATCH_SIZE = 50
+# Messages per SMTP session before the connection is recycled
+DIGEST_MESSAGES_PER_CONNECTION = 200
+
+# Compiled once at import and reused for every message
+_template_env = Environment(
+    loader=FileSystemLoader(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'templates')),
+    autoescape=select_autoescape(['html'])
+)
+DIGEST_TEMPLATE = _template_env.get_template('email/weekly_digest.html')
+
+def digest_period(now=None):
+    """Return the label, start and end of the last full Monday-to-Sunday week"""
+    now = now or datetime.now()
+    week_end = datetime.combine(now.date() - timedelta(days=now.weekday()), datetime.min.time())
+    week_start = week_end - timedelta(days=7)
+    year, week, _ = week_start.isocalendar()
+    return f'{year}-W{week:02d}', week_start, week_end
+
+def stream_digest_rows(week_start, week_end, after_user_id=0, chunk_size=DIGEST_CHUNK_SIZE):
+    """Yield chunks of (user_id, email, name, total_points, study_seconds, points_earned, achievements)"""
+    while True:
+        conn = sqlite3.connect(get_db_path())
+        c = conn.cursor()
+        c.execute(QUERIES['digest_user_chunk'], (week_start, week_end) * 3 + (after_user_id, chunk_size))
+        rows = c.fetchall()
+        conn.close()
+
+        if not rows:
+            return
+        yield rows
+        after_user_id = rows[-1][0]
+
+def render_digest(row, week_start, week_end, sender):
+    _, email, name, total_points, study_seconds, points_earned, achievements = row
+
+    msg = MIMEMultipart()
+    msg['From'] = sender
+    msg['To'] = email
+    msg['Subject'] = 'Your weekly Study Smart Timer summary'
+
+    body = DIGEST_TEMPLATE.render(
+        name=name,
+        week_start=week_start.strftime('%b %d'),
+        week_end=(week_end - timedelta(days=1)).strftime('%b %d'),
+        study_seconds=study_seconds,
+        study_hours=study_seconds // 3600,
+        study_minutes=study_seconds % 3600 // 60,
+        points_earned=points_earned,
+        total_points=total_points,
+        achievements=achievements.split('|') if achievements else []
+    )
+    msg.attach(MIMEText(body, 'html'))
+    return msg
+
+def _send_batch(pool, sender, messages):
+    """Send messages over one pooled connection, returning (sent, failed)"""
+    sent = 0
+    try:
+        connection = pool.acquire()
+    except (smtplib.SMTPException, OSError) as e:
+        logger.error(f"Could not open SMTP connection: {str(e)}")
+        return 0, len(messages)
+
+    try:
+        for msg in messages:
+            connection['sent'] += 1
+            try:
+                connection['server'].sendmail(sender, msg['To'], msg.as_string())
+                sent += 1
+            except smtplib.SMTPRecipientsRefused:
+                logger.error(f"Digest recipient refused: {msg['To']}")
+    except (smtplib.SMTPException, OSError) as e:
+        logger.error(f"SMTP connection failed mid-batch: {str(e)}")
+        pool.discard(connection)
+        return sent, len(messages) - sent
+
+    pool.release(connection)
+    return sent, len(messages) - sent
+
+def _save_checkpoint(week, last_user_id, sent, failed, finished=False):
+    conn = sqlite3.connect(get_db_path())
+    c = conn.cursor()
+    finished_at = datetime.now() if finished else None
+    c.execute(QUERIES['update_digest_run'], (last_user_id, sent, failed, finished_at, week))
+    conn.commit()
+    conn.close()
+
+def run_weekly_digest(now=None):
+    """Email every user a summary of last week, resuming an interrupted run from its checkpoint.
+
+    Progress is checkpointed after each chunk, so a crash resends at most one
+    chunk of messages.
+    """
+    settings = get_smtp_settings()
+    if not all([settings['username'], settings['password']]):
+        logger.error("SMTP credentials are not properly configured")
+        return
+
+    week, week_start, week_end = digest_period(now)
+
+    conn = sqlite3.connect(get_db_path())
+    c = conn.cursor()
+    c.execute(QUERIES['start_digest_run'], (week, datetime.now()))
+    c.execute(QUERIES['digest_run'], (week,))
+    last_user_id, sent, failed, finished_at = c.fetchone()
+    conn.commit()
+    conn.close()
+
+    if finished_at:
+        return
+    if last_user_id:
+        logger.info(f"Resuming digest {week} after user {last_user_id}")
+
+    sender = f"Study Smart Timer <{settings['username']}>"
+    pool = SMTPConnectionPool(DIGEST_POOL_SIZE, DIGEST_MESSAGES_PER_CONNECTION, settings)
+    try:
+        with ThreadPoolExecutor(max_workers=DIGEST_POOL_SIZE) as executor:
+            for rows in stream_digest_rows(week_start, week_end, last_user_id):
+                messages = [render_digest(row, week_start, week_end, sender) for row in rows]
+                batches = [messages[i:i + DIGEST_BATCH_SIZE] for i in range(0, len(messages), DIGEST_BATCH_SIZE)]
+                for batch_sent, batch_failed in executor.map(lambda batch: _send_batch(pool, sender, batch), batches):
+                    sent += batch_sent
+                    failed += batch_failed
+
+                last_user_id = rows[-1][0]
+                _save_checkpoint(week, last_user_id, sent, failed)
+    finally:
+        pool.close()
+
+    _save_checkpoint(week, last_user_id, sent, failed, finished=True)
+    logger.info(f"Weekly digest {week} finished: {sent} sent, {failed} failed")
+
+if __name__ == '__main__':
+    run_weekly_digest()
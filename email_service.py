@@ -3,16 +3,87 @@ from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 import os
 import logging
+import queue
+import threading
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+def get_smtp_settings():
+    return {
+        'server': os.getenv('SMTP_SERVER', 'smtp.gmail.com'),
+        'port': int(os.getenv('SMTP_PORT', '587')),
+        'username': os.getenv('SMTP_USERNAME'),
+        'password': os.getenv('SMTP_PASSWORD'),
+    }
+
+def open_smtp_connection(settings):
+    """Connect, start TLS and log in"""
+    logger.info(f"Attempting to connect to SMTP server {settings['server']}:{settings['port']}")
+    server = smtplib.SMTP(settings['server'], settings['port'])
+
+    logger.info("Starting TLS connection")
+    server.starttls()
+
+    logger.info("Attempting login with provided credentials")
+    server.login(settings['username'], settings['password'])
+    return server
+
+class SMTPConnectionPool:
+    """Up to `size` logged-in SMTP connections shared between sender threads.
+
+    Connections are reused across acquire/release cycles and recycled after
+    max_messages sends, since servers cap messages per session.
+    """
+
+    def __init__(self, size, max_messages=100, settings=None):
+        self.settings = settings or get_smtp_settings()
+        self.max_messages = max_messages
+        self._idle = queue.Queue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    def acquire(self):
+        self._slots.acquire()
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        try:
+            return {'server': open_smtp_connection(self.settings), 'sent': 0}
+        except Exception:
+            self._slots.release()
+            raise
+
+    def release(self, connection):
+        if connection['sent'] >= self.max_messages:
+            self._quit(connection)
+        else:
+            self._idle.put(connection)
+        self._slots.release()
+
+    def discard(self, connection):
+        """Drop a connection that failed mid-session"""
+        self._quit(connection)
+        self._slots.release()
+
+    def close(self):
+        while True:
+            try:
+                self._quit(self._idle.get_nowait())
+            except queue.Empty:
+                return
+
+    def _quit(self, connection):
+        try:
+            connection['server'].quit()
+        except (smtplib.SMTPException, OSError):
+            pass
+
 def send_otp_email(to_email, otp):
-    smtp_server = os.getenv('SMTP_SERVER', 'smtp.gmail.com')
-    smtp_port = int(os.getenv('SMTP_PORT', '587'))
-    smtp_username = os.getenv('SMTP_USERNAME')
-    smtp_password = os.getenv('SMTP_PASSWORD')
+    settings = get_smtp_settings()
+    smtp_username = settings['username']
+    smtp_password = settings['password']
 
     # Validate configuration
     if not all([smtp_username, smtp_password]):
@@ -43,14 +114,7 @@ def send_otp_email(to_email, otp):
     msg.attach(MIMEText(body, 'html'))
 
     try:
-        logger.info(f"Attempting to connect to SMTP server {smtp_server}:{smtp_port}")
-        server = smtplib.SMTP(smtp_server, smtp_port)
-        
-        logger.info("Starting TLS connection")
-        server.starttls()
-        
-        logger.info("Attempting login with provided credentials")
-        server.login(smtp_username, smtp_password)
+        server = open_smtp_connection(settings)
         
         logger.info(f"Sending email to {to_email}")
         text = msg.as_string()
@@ -0,0 +1,71 @@
+import sqlite3
+import threading
+from datetime import datetime
+from database import get_db_path
+from queries import QUERIES
+
+class SingleFlight:
+    """Collapse concurrent calls sharing a key into one execution.
+
+    The first caller runs func; callers arriving while it is in flight block
+    and receive the same result (or exception).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, func):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = {'done': threading.Event(), 'result': None, 'error': None}
+
+        if not leader:
+            call['done'].wait()
+            if call['error']:
+                raise call['error']
+            return call['result']
+
+        try:
+            call['result'] = func()
+        except Exception as e:
+            call['error'] = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call['done'].set()
+        return call['result']
+
+def get_session_completion(session_id, user_id):
+    """Return the stored end-session response for a session, or None if not completed yet"""
+    conn = sqlite3.connect(get_db_path())
+    c = conn.cursor()
+    c.execute(QUERIES['session_completion'], (session_id, user_id))
+    row = c.fetchone()
+    conn.close()
+
+    if not row:
+        return None
+    return {
+        'success': True,
+        'points_earned': row[0],
+        'focused_seconds': row[1],
+        'study_tip': row[2],
+    }
+
+def record_session_completion(c, session_id, user_id, points_earned, focused_seconds):
+    """Store the completion result using the caller's cursor, inside its transaction"""
+    c.execute(
+        QUERIES['insert_session_completion'],
+        (session_id, user_id, points_earned, focused_seconds, datetime.now())
+    )
+
+def record_session_tip(session_id, study_tip):
+    conn = sqlite3.connect(get_db_path())
+    c = conn.cursor()
+    c.execute(QUERIES['update_session_completion_tip'], (study_tip, session_id))
+    conn.commit()
+    conn.close()
@@ -0,0 +1,140 @@
+import logging
+import os
+import sqlite3
+from datetime import datetime, timedelta
+from database import get_db_path, get_archive_db_path
+from queries import QUERIES
+
+logger = logging.getLogger(__name__)
+
+# Completed sessions older than this move to the archive database; never-completed ones are deleted
+ARCHIVE_AFTER_DAYS = int(os.getenv('ARCHIVE_AFTER_DAYS', '90'))
+ARCHIVE_BATCH_SIZE = 5000
+# Free pages returned to the filesystem per incremental vacuum pass
+VACUUM_PAGES = 2000
+
+def _attach_archive(c):
+    c.execute('ATTACH DATABASE ? AS archive', (get_archive_db_path(),))
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS archive.study_sessions (
+            id INTEGER PRIMARY KEY,
+            user_id INTEGER,
+            mode TEXT,
+            duration INTEGER,
+            focused_seconds INTEGER,
+            start_time TIMESTAMP,
+            end_time TIMESTAMP
+        )
+    ''')
+    c.execute('''
+        CREATE INDEX IF NOT EXISTS archive.idx_archived_sessions_user
+        ON study_sessions (user_id, start_time)
+    ''')
+
+def archive_old_sessions(horizon_days=ARCHIVE_AFTER_DAYS, batch_size=ARCHIVE_BATCH_SIZE):
+    """Move completed sessions that ended before the horizon into the archive database.
+
+    Each batch is folded into study_session_rollups, copied to the archive and
+    deleted from the hot table (along with its cached completion responses) in
+    a single transaction. User points and study time counters are not touched.
+    Returns the number of sessions archived.
+    """
+    cutoff = datetime.now() - timedelta(days=horizon_days)
+    conn = sqlite3.connect(get_db_path(), isolation_level=None)
+    c = conn.cursor()
+    _attach_archive(c)
+
+    archived = 0
+    try:
+        while True:
+            c.execute('BEGIN IMMEDIATE')
+            c.execute(QUERIES['archive_batch_last_id'], (cutoff, batch_size))
+            last_id = c.fetchone()[0]
+            if last_id is None:
+                c.execute('COMMIT')
+                break
+
+            batch = (cutoff, last_id)
+            c.execute(QUERIES['rollup_archive_batch'], batch)
+            c.execute(QUERIES['copy_archive_batch'], batch)
+            c.execute(QUERIES['delete_archived_completions'], batch)
+            c.execute(QUERIES['delete_archive_batch'], batch)
+            archived += c.rowcount
+            c.execute('COMMIT')
+    except sqlite3.Error:
+        if conn.in_transaction:
+            c.execute('ROLLBACK')
+        raise
+    finally:
+        conn.close()
+
+    return archived
+
+def purge_abandoned_sessions(horizon_days=ARCHIVE_AFTER_DAYS, batch_size=ARCHIVE_BATCH_SIZE):
+    """Delete sessions started before the horizon that were never completed.
+
+    Breaks, reset timers and timers parked as paused never reach end-session,
+    so they would otherwise stay in the hot table forever. They earned no
+    points and have no completion rows. Returns the number of sessions deleted.
+    """
+    cutoff = datetime.now() - timedelta(days=horizon_days)
+    conn = sqlite3.connect(get_db_path(), isolation_level=None)
+    c = conn.cursor()
+
+    deleted = 0
+    try:
+        while True:
+            c.execute('BEGIN IMMEDIATE')
+            c.execute(QUERIES['abandoned_batch_last_id'], (cutoff, batch_size))
+            last_id = c.fetchone()[0]
+            if last_id is None:
+                c.execute('COMMIT')
+                break
+
+            c.execute(QUERIES['delete_abandoned_batch'], (cutoff, last_id))
+            deleted += c.rowcount
+            c.execute('COMMIT')
+    except sqlite3.Error:
+        if conn.in_transaction:
+            c.execute('ROLLBACK')
+        raise
+    finally:
+        conn.close()
+
+    return deleted
+
+def vacuum_db(pages=VACUUM_PAGES):
+    """Return free pages to the filesystem, converting to incremental auto-vacuum on first run"""
+    conn = sqlite3.connect(get_db_path(), isolation_level=None)
+    c = conn.cursor()
+    c.execute('PRAGMA auto_vacuum')
+    if c.fetchone()[0] != 2:
+        # Databases created before auto_vacuum was enabled need one full VACUUM to switch
+        c.execute('PRAGMA auto_vacuum = INCREMENTAL')
+        c.execute('VACUUM')
+    else:
+        c.execute(f'PRAGMA incremental_vacuum({int(pages)})').fetchall()
+    conn.close()
+
+def optimize_db():
+    """Refresh query planner statistics"""
+    conn = sqlite3.connect(get_db_path())
+    c = conn.cursor()
+    c.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'")
+    if not c.fetchone():
+        # PRAGMA optimize only re-analyzes tables that already have statistics
+        c.execute('ANALYZE')
+    c.execute('PRAGMA optimize').fetchall()
+    conn.commit()
+    conn.close()
+
+def run_maintenance():
+    archived = archive_old_sessions()
+    purged = purge_abandoned_sessions()
+    vacuum_db()
+    optimize_db()
+    logger.info(f"Database maintenance finished, archived {archived} sessions, purged {purged} abandoned sessions")
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    run_maintenance()
@@ -3,6 +3,7 @@ import string
 from datetime import datetime, timedelta
 import sqlite3
 from database import get_db_path
+from queries import QUERIES
 
 def generate_otp():
     """Generate a 6-digit OTP"""
@@ -14,14 +15,11 @@ def store_otp(email, otp):
     c = conn.cursor()
     
     # Remove any existing OTP for this email
-    c.execute('DELETE FROM otp_storage WHERE email = ?', (email,))
+    c.execute(QUERIES['delete_otp'], (email,))
     
     # Store new OTP
     expiration = datetime.now() + timedelta(minutes=10)
-    c.execute('''
-        INSERT INTO otp_storage (email, otp, expiration)
-        VALUES (?, ?, ?)
-    ''', (email, otp, expiration))
+    c.execute(QUERIES['insert_otp'], (email, otp, expiration))
     
     conn.commit()
     conn.close()
@@ -32,11 +30,7 @@ def verify_otp(email, otp):
     conn = sqlite3.connect(get_db_path())
     c = conn.cursor()
     
-    c.execute('''
-        SELECT otp, expiration 
-        FROM otp_storage 
-        WHERE email = ?
-    ''', (email,))
+    c.execute(QUERIES['otp_by_email'], (email,))
     
     result = c.fetchone()
     
@@ -47,7 +41,7 @@ def verify_otp(email, otp):
     expiration_time = datetime.fromisoformat(expiration)
     
     # Remove the OTP regardless of validity
-    c.execute('DELETE FROM otp_storage WHERE email = ?', (email,))
+    c.execute(QUERIES['delete_otp'], (email,))
     conn.commit()
     conn.close()
     
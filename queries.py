@@ -0,0 +1,267 @@
+"""Every SQL statement the app runs against its tables, by name.
+
+query_plans.py checks the plan of each one, so new queries belong here too.
+"""
+
+QUERIES = {
+    # Users and authentication
+    'user_by_id': 'SELECT * FROM users WHERE id = ?',
+    'user_by_email': 'SELECT * FROM users WHERE email = ?',
+    'email_user_by_email': 'SELECT * FROM users WHERE email = ? AND auth_type = ?',
+    'user_id_by_email': 'SELECT id FROM users WHERE email = ?',
+    'user_by_google_id': 'SELECT * FROM users WHERE google_id = ?',
+    'insert_email_user': '''
+        INSERT INTO users (email, name, auth_type, email_verified)
+        VALUES (?, ?, 'email', 1)
+    ''',
+    'insert_google_user': '''
+        INSERT INTO users
+        (google_id, email, name, profile_picture, points, total_study_time, auth_type, email_verified)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ''',
+    'update_google_user': '''
+        UPDATE users
+        SET email = ?, name = ?, profile_picture = ?, auth_type = ?
+        WHERE google_id = ?
+    ''',
+
+    # Dashboard bootstrap
+    'user_profile': '''
+        SELECT id, name, email, profile_picture, auth_type, email_verified
+        FROM users
+        WHERE id = ?
+    ''',
+    'user_stats': '''
+        SELECT u.points, u.total_study_time,
+            (SELECT COUNT(*) FROM study_sessions s WHERE s.user_id = u.id AND s.completed = 1)
+                + (SELECT COALESCE(SUM(r.sessions), 0) FROM study_session_rollups r WHERE r.user_id = u.id),
+            (SELECT COUNT(*) FROM user_achievements ua WHERE ua.user_id = u.id)
+        FROM users u
+        WHERE u.id = ?
+    ''',
+    'leaderboard': '''
+        SELECT id, name, points
+        FROM users
+        ORDER BY points DESC, id
+        LIMIT ?
+    ''',
+    'user_rank': 'SELECT COUNT(*) + 1 FROM users WHERE points > (SELECT points FROM users WHERE id = ?)',
+
+    # One-time passwords
+    'otp_by_email': '''
+        SELECT otp, expiration
+        FROM otp_storage
+        WHERE email = ?
+    ''',
+    'insert_otp': '''
+        INSERT INTO otp_storage (email, otp, expiration)
+        VALUES (?, ?, ?)
+    ''',
+    'delete_otp': 'DELETE FROM otp_storage WHERE email = ?',
+
+    # Study sessions and timers
+    'insert_study_session': '''
+        INSERT INTO study_sessions
+        (user_id, mode, kind, duration, start_time, completed, state)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    ''',
+    'session_timer': '''
+        SELECT user_id, duration, state, focused_seconds, last_heartbeat, start_time
+        FROM study_sessions
+        WHERE id = ?
+    ''',
+    'persist_session_timer': '''
+        UPDATE study_sessions
+        SET state = ?, focused_seconds = ?, last_heartbeat = ?
+        WHERE id = ? AND state != 'completed' AND (last_heartbeat IS NULL OR last_heartbeat <= ?)
+    ''',
+    'complete_study_session': '''
+        UPDATE study_sessions
+        SET completed = ?, end_time = ?, focused_seconds = ?
+        WHERE id = ? AND user_id = ? AND completed = 0
+    ''',
+    'award_session_points': '''
+        UPDATE users
+        SET points = points + ?, total_study_time = total_study_time + ?
+        WHERE id = ?
+    ''',
+
+    # Session completion responses
+    'session_completion': '''
+        SELECT points_earned, focused_seconds, study_tip
+        FROM session_completions
+        WHERE session_id = ? AND user_id = ?
+    ''',
+    'insert_session_completion': '''
+        INSERT INTO session_completions
+        (session_id, user_id, points_earned, focused_seconds, completed_at)
+        VALUES (?, ?, ?, ?, ?)
+    ''',
+    'update_session_completion_tip': 'UPDATE session_completions SET study_tip = ? WHERE session_id = ?',
+
+    # Achievements
+    'user_achievements': '''
+        SELECT a.id, a.name, a.description, a.points_required, a.badge_image, a.badge_source,
+            ua.user_id IS NOT NULL
+        FROM achievements a
+        LEFT JOIN user_achievements ua ON ua.achievement_id = a.id AND ua.user_id = ?
+        ORDER BY a.id
+    ''',
+    'achievement_badges': 'SELECT id, name, badge_image, badge_source FROM achievements ORDER BY id',
+    'update_achievement_badge': 'UPDATE achievements SET badge_image = ? WHERE id = ?',
+
+    # Study groups
+    'list_study_groups': '''
+        SELECT
+            sg.id, sg.name, sg.created_by, sg.created_at,
+            COUNT(DISTINCT gm.user_id) as member_count,
+            MAX(CASE WHEN gm2.user_id = ? THEN 1 ELSE 0 END) as is_member
+        FROM study_groups sg
+        LEFT JOIN group_members gm ON sg.id = gm.group_id
+        LEFT JOIN group_members gm2 ON sg.id = gm2.group_id AND gm2.user_id = ?
+        GROUP BY sg.id
+    ''',
+    'search_study_groups': '''
+        SELECT
+            sg.id, sg.name, sg.description, sg.created_by, sg.created_at,
+            sg.member_count, sg.last_active_at,
+            gm.user_id IS NOT NULL as is_member
+        FROM study_groups_fts
+        JOIN study_groups sg ON sg.id = study_groups_fts.rowid
+        LEFT JOIN group_members gm ON gm.group_id = sg.id AND gm.user_id = ?
+        WHERE study_groups_fts MATCH ?
+            AND (? IS NULL OR (sg.member_count, COALESCE(sg.last_active_at, ''), sg.id) < (?, ?, ?))
+        ORDER BY sg.member_count DESC, COALESCE(sg.last_active_at, '') DESC, sg.id DESC
+        LIMIT ?
+    ''',
+    'insert_study_group': '''
+        INSERT INTO study_groups (name, description, created_by, created_at)
+        VALUES (?, ?, ?, ?)
+    ''',
+    'insert_group_member': '''
+        INSERT INTO group_members (group_id, user_id, joined_at)
+        VALUES (?, ?, ?)
+    ''',
+    'group_membership': '''
+        SELECT 1 FROM group_members
+        WHERE group_id = ? AND user_id = ?
+    ''',
+    'group_member_count': '''
+        SELECT COUNT(*) FROM group_members WHERE group_id = ?
+    ''',
+
+    # Personalized tips
+    'active_user_ids': '''
+        SELECT DISTINCT user_id
+        FROM study_sessions
+        WHERE user_id > ? AND start_time >= ? AND kind = 'focus'
+        ORDER BY user_id
+        LIMIT ?
+    ''',
+    'user_activity_by_day': '''
+        SELECT user_id, date(start_time), mode, COUNT(*), SUM(completed),
+               CAST(strftime('%H', start_time) AS INTEGER)
+        FROM study_sessions
+        WHERE user_id BETWEEN ? AND ? AND start_time >= ? AND kind = 'focus'
+        GROUP BY user_id, date(start_time), mode, strftime('%H', start_time)
+        ORDER BY user_id
+    ''',
+    'upsert_user_tip': '''
+        INSERT OR REPLACE INTO user_tips (user_id, slot, tip, generated_at)
+        VALUES (?, ?, ?, ?)
+    ''',
+    'trim_user_tips': 'DELETE FROM user_tips WHERE user_id = ? AND slot >= ?',
+    'user_tip': '''
+        SELECT tip FROM user_tips
+        WHERE user_id = ? AND slot <= ?
+        ORDER BY slot DESC
+        LIMIT 1
+    ''',
+
+    # Weekly digest
+    'digest_user_chunk': '''
+        SELECT u.id, u.email, u.name, u.points,
+            (SELECT COALESCE(SUM(s.focused_seconds), 0) FROM study_sessions s
+             WHERE s.user_id = u.id AND s.completed = 1
+             AND s.start_time >= ? AND s.start_time < ?),
+            (SELECT COALESCE(SUM(sc.points_earned), 0) FROM session_completions sc
+             WHERE sc.user_id = u.id
+             AND sc.completed_at >= ? AND sc.completed_at < ?),
+            (SELECT group_concat(a.name, '|') FROM user_achievements ua
+             JOIN achievements a ON a.id = ua.achievement_id
+             WHERE ua.user_id = u.id
+             AND ua.date_earned >= ? AND ua.date_earned < ?)
+        FROM users u
+        WHERE u.id > ? AND u.email IS NOT NULL
+        ORDER BY u.id
+        LIMIT ?
+    ''',
+    'start_digest_run': '''
+        INSERT OR IGNORE INTO digest_runs (week, last_user_id, sent, failed, started_at)
+        VALUES (?, 0, 0, 0, ?)
+    ''',
+    'digest_run': 'SELECT last_user_id, sent, failed, finished_at FROM digest_runs WHERE week = ?',
+    'update_digest_run': '''
+        UPDATE digest_runs
+        SET last_user_id = ?, sent = ?, failed = ?, finished_at = ?
+        WHERE week = ?
+    ''',
+
+    # Archival (the archive database is attached as "archive")
+    'archive_batch_last_id': '''
+        SELECT MAX(id) FROM (
+            SELECT id FROM study_sessions
+            WHERE completed = 1 AND end_time < ?
+            ORDER BY id
+            LIMIT ?
+        )
+    ''',
+    'rollup_archive_batch': '''
+        INSERT INTO study_session_rollups (user_id, day, mode, sessions, focused_seconds)
+        SELECT user_id, date(start_time), mode, COUNT(*), SUM(focused_seconds)
+        FROM study_sessions
+        WHERE completed = 1 AND end_time < ? AND id <= ?
+        GROUP BY user_id, date(start_time), mode
+        ON CONFLICT (user_id, day, mode) DO UPDATE SET
+            sessions = sessions + excluded.sessions,
+            focused_seconds = focused_seconds + excluded.focused_seconds
+    ''',
+    'copy_archive_batch': '''
+        INSERT INTO archive.study_sessions
+        (id, user_id, mode, duration, focused_seconds, start_time, end_time)
+        SELECT id, user_id, mode, duration, focused_seconds, start_time, end_time
+        FROM study_sessions
+        WHERE completed = 1 AND end_time < ? AND id <= ?
+    ''',
+    'delete_archived_completions': '''
+        DELETE FROM session_completions
+        WHERE session_id IN (
+            SELECT id FROM study_sessions
+            WHERE completed = 1 AND end_time < ? AND id <= ?
+        )
+    ''',
+    'delete_archive_batch': '''
+        DELETE FROM study_sessions
+        WHERE completed = 1 AND end_time < ? AND id <= ?
+    ''',
+    'abandoned_batch_last_id': '''
+        SELECT MAX(id) FROM (
+            SELECT id FROM study_sessions
+            WHERE completed = 0 AND start_time < ?
+            ORDER BY id
+            LIMIT ?
+        )
+    ''',
+    'delete_abandoned_batch': '''
+        DELETE FROM study_sessions
+        WHERE completed = 0 AND start_time < ? AND id <= ?
+    ''',
+
+    # Background job scheduling
+    'register_scheduled_job': 'INSERT OR IGNORE INTO scheduled_jobs (name, last_run) VALUES (?, NULL)',
+    'claim_scheduled_job': '''
+        UPDATE scheduled_jobs
+        SET last_run = ?
+        WHERE name = ? AND (last_run IS NULL OR last_run <= ?)
+    ''',
+}
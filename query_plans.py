@@ -0,0 +1,266 @@
+"""Query plan regression checks for every statement in queries.QUERIES.
+
+Seeds a scratch database with a large synthetic data set, then:
+
+- runs EXPLAIN QUERY PLAN for each query and fails if it scans a hot table or
+  sorts with a temp B-tree, unless the query is listed in PLAN_EXCEPTIONS, or
+  if a query that reads a table has no plan line naming one
+- counts the SQLite virtual machine steps each read query in SAMPLE_PARAMS
+  takes and fails if one needs much more work than its recorded baseline in
+  query_baselines.json. Step counts follow the rows a query examines rather
+  than the speed of the machine, so baselines hold across machines; they are
+  only compared when seeded with the same number of users.
+
+Usage: python query_plans.py [--users N] [--update-baselines] [--skip-benchmarks]
+"""
+import argparse
+import json
+import os
+import random
+import re
+import sqlite3
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+BASELINES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'query_baselines.json')
+
+# Tables that grow with usage; a full scan of one of these is a regression
+HOT_TABLES = {
+    'users', 'study_sessions', 'session_completions', 'study_groups', 'group_members',
+    'user_achievements', 'user_tips', 'otp_storage', 'study_session_rollups',
+}
+
+# Queries allowed to scan a hot table or build a temp B-tree, and why
+PLAN_EXCEPTIONS = {
+    'list_study_groups': 'returns every group by design; use search_study_groups to find one',
+    'leaderboard': 'walks idx_users_points in order and stops at the limit',
+    'search_study_groups': 'sorts only the full-text matches of terms of three or more characters',
+    'archive_batch_last_id': 'walks sessions in id order and stops after one batch of expired rows',
+    'abandoned_batch_last_id': 'walks sessions in id order and stops after one batch of expired rows',
+    'rollup_archive_batch': 'maintenance job, groups one archive batch',
+    'user_activity_by_day': 'batch job, groups one chunk of users',
+}
+
+# Representative parameters for benchmarking read queries against the seeded data
+SAMPLE_PARAMS = {
+    'user_by_id': lambda n: (n // 2,),
+    'user_by_email': lambda n: (f'user{n // 2}@example.com',),
+    'email_user_by_email': lambda n: (f'user{n // 2}@example.com', 'email'),
+    'user_id_by_email': lambda n: (f'user{n // 2}@example.com',),
+    'user_by_google_id': lambda n: (f'google-{n // 2}',),
+    'user_profile': lambda n: (n // 2,),
+    'user_stats': lambda n: (n // 2,),
+    'leaderboard': lambda n: (10,),
+    'user_rank': lambda n: (n // 2,),
+    'otp_by_email': lambda n: ('user1@example.com',),
+    'session_timer': lambda n: (n * 5,),
+    'session_completion': lambda n: (n * 5, 1),
+    'user_achievements': lambda n: (n // 2,),
+    'group_membership': lambda n: (n // 8, n // 2),
+    'group_member_count': lambda n: (n // 8,),
+    'search_study_groups': lambda n: (n // 2, '"calc"*', None, None, None, None, 21),
+    'user_tip': lambda n: (n // 2, 1),
+    'active_user_ids': lambda n: (0, datetime.now() - timedelta(days=14), 500),
+    'user_activity_by_day': lambda n: (1, 500, datetime.now() - timedelta(days=14)),
+    'digest_user_chunk': lambda n: (
+        (datetime.now() - timedelta(days=7), datetime.now()) * 3 + (0, 500)
+    ),
+    'digest_run': lambda n: ('2026-W01',),
+}
+# A query fails its benchmark when it takes more than baseline * tolerance + slack steps
+BASELINE_TOLERANCE = 2.0
+BASELINE_SLACK_STEPS = 200
+
+GROUP_WORDS = ['Calculus', 'Biology', 'Chemistry', 'Physics', 'History', 'Algebra', 'Poetry', 'Coding']
+SQL_KEYWORDS = {'ON', 'WHERE', 'JOIN', 'LEFT', 'INNER', 'GROUP', 'ORDER', 'LIMIT', 'SET', 'AS', 'USING'}
+
+def seed_database(users):
+    """Create a fresh schema at the configured path and fill it with synthetic data"""
+    from database import init_db, get_db_path
+    init_db()
+
+    rng = random.Random(42)
+    now = datetime.now()
+    groups = max(users // 4, 1)
+    conn = sqlite3.connect(get_db_path())
+    c = conn.cursor()
+
+    c.executemany('''
+        INSERT INTO users (id, google_id, email, name, points, total_study_time, auth_type, email_verified)
+        VALUES (?, ?, ?, ?, ?, ?, ?, 1)
+    ''', (
+        (i, f'google-{i}' if i % 2 else None, f'user{i}@example.com', f'User {i}',
+         rng.randint(0, 5000), rng.randint(0, 100000), 'google' if i % 2 else 'email')
+        for i in range(1, users + 1)
+    ))
+
+    def sessions():
+        for session_id in range(1, users * 10 + 1):
+            start = now - timedelta(days=rng.uniform(0, 120))
+            kind = 'break' if rng.random() < 0.2 else 'focus'
+            completed = kind == 'focus' and rng.random() < 0.8
+            yield (session_id, rng.randint(1, users), rng.choice(['focus', 'deep', 'custom']), kind, 1500,
+                   completed, start, start + timedelta(minutes=25) if completed else None,
+                   'completed' if completed else 'paused', 1500 if completed else 600)
+    c.executemany('''
+        INSERT INTO study_sessions
+        (id, user_id, mode, kind, duration, completed, start_time, end_time, state, focused_seconds)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', sessions())
+    c.execute('''
+        INSERT INTO session_completions (session_id, user_id, points_earned, focused_seconds, completed_at)
+        SELECT id, user_id, 50, focused_seconds, end_time FROM study_sessions WHERE completed = 1
+    ''')
+
+    c.executemany('INSERT INTO study_groups (id, name, created_by, created_at) VALUES (?, ?, ?, ?)', (
+        (i, f'{rng.choice(GROUP_WORDS)} group {i}', rng.randint(1, users), now - timedelta(days=rng.uniform(0, 365)))
+        for i in range(1, groups + 1)
+    ))
+    c.executemany('INSERT OR IGNORE INTO group_members (group_id, user_id, joined_at) VALUES (?, ?, ?)', (
+        (rng.randint(1, groups), rng.randint(1, users), now - timedelta(days=rng.uniform(0, 365)))
+        for _ in range(groups * 3)
+    ))
+
+    c.executemany('INSERT OR IGNORE INTO user_achievements (user_id, achievement_id, date_earned) VALUES (?, ?, ?)', (
+        (rng.randint(1, users), rng.randint(1, 5), now - timedelta(days=rng.uniform(0, 60)))
+        for _ in range(users)
+    ))
+    c.executemany('INSERT INTO user_tips (user_id, slot, tip, generated_at) VALUES (?, ?, ?, ?)', (
+        (user_id, slot, f'Tip {slot} for user {user_id}', now)
+        for user_id in range(1, users + 1) for slot in range(3)
+    ))
+    c.executemany('INSERT INTO otp_storage (email, otp, expiration) VALUES (?, ?, ?)', (
+        (f'user{i}@example.com', '123456', now + timedelta(minutes=10)) for i in range(1, users + 1, 10)
+    ))
+
+    conn.commit()
+    c.execute('ANALYZE')
+    conn.close()
+
+def _table_aliases(sql):
+    aliases = {}
+    for table, alias in re.findall(r'\b(?:FROM|JOIN|INTO|UPDATE)\s+([\w.]+)(?:\s+(?:AS\s+)?(\w+))?', sql, re.I):
+        table = table.split('.')[-1]
+        aliases[table] = table
+        if alias and alias.upper() not in SQL_KEYWORDS:
+            aliases[alias] = table
+    return aliases
+
+def plan_problems(c, name, sql):
+    """Return the plan lines of a query that scan a hot table or use a temp B-tree.
+
+    Raises ValueError if the query reads a table but no plan line names one,
+    so a change in SQLite's plan format can't make the check pass vacuously.
+    """
+    c.execute(f'EXPLAIN QUERY PLAN {sql}', (None,) * sql.count('?'))
+    aliases = _table_aliases(sql)
+    problems = []
+    accesses = 0
+    for row in c.fetchall():
+        detail = row[-1]
+        # SQLite before 3.36 writes "SCAN TABLE x AS y", later versions "SCAN y"
+        access = re.match(r'(SCAN|SEARCH) (?:TABLE )?(\w+)', detail)
+        if access:
+            accesses += 1
+        if access and access.group(1) == 'SCAN' and 'VIRTUAL TABLE' not in detail \
+                and aliases.get(access.group(2)) in HOT_TABLES:
+            problems.append(detail)
+        elif detail.startswith('USE TEMP B-TREE'):
+            problems.append(detail)
+    if not accesses and re.search(r'\b(?:FROM|UPDATE)\b', sql, re.I):
+        raise ValueError('no table access found in the query plan')
+    return problems
+
+def count_steps(conn, sql, params):
+    """SQLite virtual machine steps needed to run a query to completion"""
+    steps = 0
+    def step():
+        nonlocal steps
+        steps += 1
+    conn.set_progress_handler(step, 1)
+    try:
+        conn.execute(sql, params).fetchall()
+    finally:
+        conn.set_progress_handler(None, 1)
+    return steps
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=20000, help='synthetic users to seed (10 sessions each)')
+    parser.add_argument('--update-baselines', action='store_true', help='record current step counts as baselines')
+    parser.add_argument('--skip-benchmarks', action='store_true', help='only check query plans')
+    args = parser.parse_args()
+
+    scratch = tempfile.mkdtemp(prefix='smartstudy-plans-')
+    os.environ['SMARTSTUDY_DB_PATH'] = os.path.join(scratch, 'SmartStudy.db')
+    os.environ['SMARTSTUDY_ARCHIVE_DB_PATH'] = os.path.join(scratch, 'SmartStudyArchive.db')
+
+    from database import get_db_path
+    from maintenance import _attach_archive
+    from queries import QUERIES
+
+    print(f"Seeding {args.users} users into {scratch}...")
+    seed_database(args.users)
+
+    conn = sqlite3.connect(get_db_path())
+    c = conn.cursor()
+    _attach_archive(c)
+    failures = []
+
+    for name, sql in QUERIES.items():
+        try:
+            problems = plan_problems(c, name, sql)
+        except ValueError as e:
+            failures.append(name)
+            print(f"FAIL plan  {name}: {e}")
+            continue
+        if problems and name not in PLAN_EXCEPTIONS:
+            failures.append(name)
+            print(f"FAIL plan  {name}: {'; '.join(problems)}")
+        else:
+            print(f"ok   plan  {name}")
+
+    if not args.skip_benchmarks:
+        baselines = {}
+        if os.path.exists(BASELINES_PATH):
+            with open(BASELINES_PATH) as f:
+                baselines = json.load(f)
+        if baselines.get('users') != args.users:
+            if baselines and not args.update_baselines:
+                print(f"Baselines were recorded with --users {baselines.get('users')}; not comparing")
+            baselines = {}
+
+        steps = {}
+        for name, params in SAMPLE_PARAMS.items():
+            steps[name] = count_steps(conn, QUERIES[name], params(args.users))
+            baseline = baselines.get('steps', {}).get(name)
+            if args.update_baselines or baseline is None:
+                print(f"     bench {name}: {steps[name]} steps")
+            elif steps[name] > baseline * BASELINE_TOLERANCE + BASELINE_SLACK_STEPS:
+                failures.append(name)
+                print(f"FAIL bench {name}: {steps[name]} steps (baseline {baseline})")
+            else:
+                print(f"ok   bench {name}: {steps[name]} steps (baseline {baseline})")
+
+        if args.update_baselines:
+            with open(BASELINES_PATH, 'w') as f:
+                json.dump({'users': args.users, 'steps': steps}, f, indent=4, sort_keys=True)
+                f.write('\n')
+            print(f"Baselines written to {BASELINES_PATH}")
+
+    conn.close()
+
+    missing = set(PLAN_EXCEPTIONS) | set(SAMPLE_PARAMS)
+    missing -= set(QUERIES)
+    if missing:
+        failures.extend(sorted(missing))
+        print(f"FAIL unknown query names: {', '.join(sorted(missing))}")
+
+    if failures:
+        print(f"{len(failures)} query check(s) failed")
+        sys.exit(1)
+    print("All query checks passed")
+
+if __name__ == '__main__':
+    main()
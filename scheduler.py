@@ -0,0 +1,79 @@
+import logging
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from database import get_db_path
+from queries import QUERIES
+
+logger = logging.getLogger(__name__)
+
+# Local hours [start, end) treated as off-peak for heavy background work
+OFF_PEAK_START_HOUR = int(os.getenv('OFF_PEAK_START_HOUR', '2'))
+OFF_PEAK_END_HOUR = int(os.getenv('OFF_PEAK_END_HOUR', '5'))
+SCHEDULER_POLL_SECONDS = 60
+
+def in_off_peak(now):
+    if OFF_PEAK_START_HOUR <= OFF_PEAK_END_HOUR:
+        return OFF_PEAK_START_HOUR <= now.hour < OFF_PEAK_END_HOUR
+    return now.hour >= OFF_PEAK_START_HOUR or now.hour < OFF_PEAK_END_HOUR
+
+class JobScheduler:
+    """Runs registered jobs periodically on a background thread.
+
+    Last run times live in the scheduled_jobs table and a run is claimed with a
+    conditional update, so restarts and multiple app processes don't repeat a
+    job before it is due.
+    """
+
+    def __init__(self, poll_seconds=SCHEDULER_POLL_SECONDS):
+        self.poll_seconds = poll_seconds
+        self._jobs = []
+        self._thread = None
+        self._stop = threading.Event()
+
+    def register(self, name, func, every, off_peak=False):
+        """Run func at most once per `every` timedelta, only off-peak if requested"""
+        self._jobs.append({'name': name, 'func': func, 'every': every, 'off_peak': off_peak})
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='job-scheduler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def run_pending(self, now=None):
+        now = now or datetime.now()
+        for job in self._jobs:
+            if job['off_peak'] and not in_off_peak(now):
+                continue
+            if self._claim(job, now):
+                self._run_job(job)
+
+    def _run(self):
+        while not self._stop.wait(self.poll_seconds):
+            self.run_pending()
+
+    def _claim(self, job, now):
+        conn = sqlite3.connect(get_db_path())
+        c = conn.cursor()
+        c.execute(QUERIES['register_scheduled_job'], (job['name'],))
+        c.execute(QUERIES['claim_scheduled_job'], (now, job['name'], now - job['every']))
+        claimed = c.rowcount == 1
+        conn.commit()
+        conn.close()
+        return claimed
+
+    def _run_job(self, job):
+        logger.info(f"Running scheduled job {job['name']}")
+        try:
+            job['func']()
+        except Exception as e:
+            logger.error(f"Scheduled job {job['name']} failed: {str(e)}")
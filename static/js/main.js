@@ -5,6 +5,7 @@ let timeLeft = 0;
 let isBreak = false;
 let currentMode = 'focus';
 let isPaused = false;
+let heartbeatInterval = null;
 
 const modes = {
     focus: { study: 25, break: 5 },
@@ -31,6 +32,7 @@ function showNotification(message) {
 
 async function startSession() {
     const mode = currentMode;
+    const kind = isBreak ? 'break' : 'focus';
     const duration = isBreak ? 
         modes[mode].break * 60 : 
         modes[mode].study * 60;
@@ -38,40 +40,63 @@ async function startSession() {
     const response = await fetch('/api/start-session', {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ mode, duration })
+        body: JSON.stringify({ mode, kind, duration })
     });
     const data = await response.json();
     currentSession = data.session_id;
     return duration;
 }
 
+// Report progress so the server can track focused time
+async function sendHeartbeat() {
+    if (!currentSession || isPaused) return;
+    const response = await fetch(`/api/sessions/${currentSession}/heartbeat`, { method: 'POST' });
+    if (response.ok) {
+        const data = await response.json();
+        // The server is authoritative for how much focus time is left
+        if (data.state === 'running') {
+            timeLeft = data.remaining_seconds;
+            updateTimer(timeLeft);
+        }
+    }
+}
+
+async function setSessionPaused(paused) {
+    if (!currentSession) return;
+    await fetch(`/api/sessions/${currentSession}/${paused ? 'pause' : 'resume'}`, { method: 'POST' });
+}
+
 async function endSession() {
     if (currentSession) {
         const response = await fetch('/api/end-session', {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({ 
-                session_id: currentSession,
-                duration: modes[currentMode].study * 60
-            })
+            body: JSON.stringify({ session_id: currentSession })
         });
         const data = await response.json();
         showNotification(data.study_tip);
         
-        // Play the TTS audio
-        const audio = new Audio('/static/audio/notification.mp3');
-        audio.play();
+        // Play this session's spoken tip, if it was synthesized in time
+        if (data.audio_url) {
+            const audio = new Audio(data.audio_url);
+            audio.play();
+        }
     }
 }
 
-// Load achievements
-async function loadAchievements() {
-    const response = await fetch('/api/achievements');
-    const achievements = await response.json();
+// Load everything the dashboard shows in one request
+async function loadDashboard() {
+    const response = await fetch('/api/bootstrap?fields=achievements,groups');
+    const data = await response.json();
+    renderAchievements(data.achievements);
+    renderStudyGroups(data.groups);
+}
+
+function renderAchievements(achievements) {
     const container = document.getElementById('achievements');
     container.innerHTML = achievements.map(achievement => `
         <div class="bg-gray-50 p-4 rounded-lg ${achievement.earned ? 'border-2 border-green-500' : ''}">
-            <img src="/static/${achievement.badge_image}" alt="${achievement.name}" class="w-12 h-12 mb-2">
+            <img src="${achievement.badge_url}" srcset="${achievement.badge_srcset}" alt="${achievement.name}" class="w-12 h-12 mb-2" loading="lazy">
             <h3 class="font-semibold">${achievement.name}</h3>
             <p class="text-sm text-gray-600">${achievement.description}</p>
         </div>
@@ -81,7 +106,23 @@ async function loadAchievements() {
 // Load study groups
 async function loadStudyGroups() {
     const response = await fetch('/api/study-groups');
-    const groups = await response.json();
+    renderStudyGroups(await response.json());
+}
+
+// Search study groups on the server
+let groupSearchTimeout = null;
+async function searchStudyGroups(query) {
+    // The server ignores terms shorter than three characters
+    if (query.trim().length < 3) {
+        loadStudyGroups();
+        return;
+    }
+    const response = await fetch(`/api/study-groups/search?q=${encodeURIComponent(query)}`);
+    const data = await response.json();
+    renderStudyGroups(data.groups);
+}
+
+function renderStudyGroups(groups) {
     const container = document.getElementById('studyGroups');
     container.innerHTML = groups.map(group => `
         <div class="bg-gray-50 p-4 rounded-lg">
@@ -189,6 +230,7 @@ document.addEventListener('DOMContentLoaded', function() {
                 }
             }
         }, 1000);
+        heartbeatInterval = setInterval(sendHeartbeat, 30000);
 
         document.getElementById('startBtn').classList.add('hidden');
         document.getElementById('pauseBtn').classList.remove('hidden');
@@ -196,18 +238,23 @@ document.addEventListener('DOMContentLoaded', function() {
 
     document.getElementById('pauseBtn').addEventListener('click', () => {
         isPaused = true;
+        setSessionPaused(true);
         document.getElementById('pauseBtn').classList.add('hidden');
         document.getElementById('resumeBtn').classList.remove('hidden');
     });
 
     document.getElementById('resumeBtn').addEventListener('click', () => {
         isPaused = false;
+        setSessionPaused(false);
         document.getElementById('resumeBtn').classList.add('hidden');
         document.getElementById('pauseBtn').classList.remove('hidden');
     });
 
     document.getElementById('resetBtn').addEventListener('click', () => {
         clearInterval(timerInterval);
+        clearInterval(heartbeatInterval);
+        setSessionPaused(true);
+        currentSession = null;
         isPaused = false;
         isBreak = false;
         timeLeft = modes[currentMode].study * 60;
@@ -266,12 +313,17 @@ document.addEventListener('DOMContentLoaded', function() {
         }
     });
 
+    // Search study groups as the user types
+    document.getElementById('groupSearch').addEventListener('input', (e) => {
+        clearTimeout(groupSearchTimeout);
+        groupSearchTimeout = setTimeout(() => searchStudyGroups(e.target.value), 300);
+    });
+
     // Dismiss notification
     document.getElementById('dismissNotification').addEventListener('click', () => {
         document.getElementById('notification').classList.remove('show');
     });
 
-    // Initial loads
-    loadAchievements();
-    loadStudyGroups();
+    // Initial load
+    loadDashboard();
 });
\ No newline at end of file
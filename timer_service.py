@@ -0,0 +1,162 @@
+import os
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from database import get_db_path
+from queries import QUERIES
+
+# Clients heartbeat at this interval while a session is running
+HEARTBEAT_INTERVAL = int(os.getenv('TIMER_HEARTBEAT_INTERVAL', '30'))
+# Most focus time credited between two heartbeats, so a closed tab stops accruing
+HEARTBEAT_GRACE = HEARTBEAT_INTERVAL * 2
+# Running sessions are checkpointed to the database at most this often
+PERSIST_INTERVAL = int(os.getenv('TIMER_PERSIST_INTERVAL', '300'))
+# Timers idle for longer than this are flushed and dropped from memory
+STALE_AFTER = timedelta(hours=6)
+
+# In-memory timer state per session id. Timers live in the process that
+# started or last loaded them; a process that misses one reloads it from the
+# database and credits the time since its last checkpoint (see _load_timer).
+_timers = {}
+# Guards _timers only; database reads and writes happen outside it
+_lock = threading.Lock()
+
+def _load_timer(session_id):
+    conn = sqlite3.connect(get_db_path())
+    c = conn.cursor()
+    c.execute(QUERIES['session_timer'], (session_id,))
+    row = c.fetchone()
+    conn.close()
+    if not row:
+        return None
+
+    user_id, duration, state, focused_seconds, last_heartbeat, start_time = row
+    last_tick = last_heartbeat or start_time
+    return {
+        'session_id': session_id,
+        'user_id': user_id,
+        'duration': duration or 0,
+        'state': state or 'running',
+        'focused_seconds': float(focused_seconds or 0),
+        'last_tick': datetime.fromisoformat(last_tick) if last_tick else datetime.now(),
+        'last_persisted': datetime.now(),
+        # The checkpoint may lag the live timer by up to PERSIST_INTERVAL, so
+        # the first accrual after a reload may cover that gap too
+        'max_gap': PERSIST_INTERVAL + HEARTBEAT_GRACE,
+    }
+
+def _checkpoint(timer, now):
+    """Mark timer as persisted and return the row to write, taken under _lock"""
+    timer['last_persisted'] = now
+    return (timer['state'], int(timer['focused_seconds']), timer['last_tick'], timer['session_id'], timer['last_tick'])
+
+def _write_checkpoints(rows):
+    """Write checkpoints outside _lock; rows older than the stored one or for completed sessions are skipped"""
+    if not rows:
+        return
+    conn = sqlite3.connect(get_db_path())
+    conn.cursor().executemany(QUERIES['persist_session_timer'], rows)
+    conn.commit()
+    conn.close()
+
+def _accrue(timer, now):
+    """Credit focus time since the last tick, bounded by the heartbeat grace period"""
+    if timer['state'] == 'running':
+        elapsed = (now - timer['last_tick']).total_seconds()
+        credited = timer['focused_seconds'] + max(0, min(elapsed, timer.get('max_gap', HEARTBEAT_GRACE)))
+        timer['focused_seconds'] = min(credited, timer['duration'])
+    timer['last_tick'] = now
+    timer['max_gap'] = HEARTBEAT_GRACE
+
+def _pop_stale(now):
+    """Pause and drop idle timers under _lock, returning their checkpoints"""
+    rows = []
+    for timer in [timer for timer in _timers.values() if now - timer['last_tick'] > STALE_AFTER]:
+        _accrue(timer, now)
+        timer['state'] = 'paused'
+        rows.append(_checkpoint(timer, now))
+        del _timers[timer['session_id']]
+    return rows
+
+def snapshot(timer):
+    """Public view of a timer for API responses"""
+    focused_seconds = int(timer['focused_seconds'])
+    return {
+        'session_id': timer['session_id'],
+        'state': timer['state'],
+        'focused_seconds': focused_seconds,
+        'remaining_seconds': max(0, timer['duration'] - focused_seconds),
+        'heartbeat_interval': HEARTBEAT_INTERVAL,
+    }
+
+def start_timer(session_id, user_id, duration):
+    """Register a freshly inserted session as running"""
+    now = datetime.now()
+    with _lock:
+        stale = _pop_stale(now)
+        _timers[session_id] = {
+            'session_id': session_id,
+            'user_id': user_id,
+            'duration': duration or 0,
+            'state': 'running',
+            'focused_seconds': 0.0,
+            'last_tick': now,
+            'last_persisted': now,
+        }
+        result = snapshot(_timers[session_id])
+    _write_checkpoints(stale)
+    return result
+
+def _transition(session_id, user_id, new_state=None):
+    """Apply a heartbeat or state change, returning a snapshot or None if not owned by user_id.
+
+    Heartbeats only touch memory unless PERSIST_INTERVAL has passed; state
+    transitions are always written through.
+    """
+    with _lock:
+        timer = _timers.get(session_id)
+    if timer is None:
+        loaded = _load_timer(session_id)
+        if loaded is None or loaded['user_id'] != user_id:
+            return None
+        if loaded['state'] == 'completed':
+            return snapshot(loaded)
+        with _lock:
+            # Another request may have loaded it meanwhile
+            timer = _timers.setdefault(session_id, loaded)
+
+    now = datetime.now()
+    with _lock:
+        if timer['user_id'] != user_id:
+            return None
+        if timer['state'] == 'completed':
+            return snapshot(timer)
+
+        _accrue(timer, now)
+        row = None
+        if new_state and new_state != timer['state']:
+            timer['state'] = new_state
+            row = _checkpoint(timer, now)
+        elif now - timer['last_persisted'] >= timedelta(seconds=PERSIST_INTERVAL):
+            row = _checkpoint(timer, now)
+
+        if timer['state'] == 'completed':
+            _timers.pop(session_id, None)
+        result = snapshot(timer)
+
+    if row:
+        _write_checkpoints([row])
+    return result
+
+def heartbeat(session_id, user_id):
+    return _transition(session_id, user_id)
+
+def pause_timer(session_id, user_id):
+    return _transition(session_id, user_id, 'paused')
+
+def resume_timer(session_id, user_id):
+    return _transition(session_id, user_id, 'running')
+
+def finish_timer(session_id, user_id):
+    """Stop the timer and return its final state, or None if not owned by user_id"""
+    return _transition(session_id, user_id, 'completed')
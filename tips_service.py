@@ -0,0 +1,183 @@
+import json
+import logging
+import os
+import sqlite3
+from collections import Counter
+from datetime import datetime, timedelta
+from itertools import groupby
+import requests
+from database import get_db_path
+from queries import QUERIES
+
+logger = logging.getLogger(__name__)
+
+A4F_API_KEY = os.getenv("A4F_API_KEY")
+A4F_API_URL = "https://api.a4f.co/v1"
+
+# Users described per chat completion call
+TIP_BATCH_SIZE = int(os.getenv('TIP_BATCH_SIZE', '20'))
+TIPS_PER_USER = 3
+# How far back study patterns are taken from
+ACTIVITY_WINDOW_DAYS = 14
+# Users whose sessions are read from the database at a time
+PROFILE_CHUNK_SIZE = 500
+TIP_REQUEST_TIMEOUT = 60
+
+def _time_of_day(hour):
+    if 5 <= hour < 12:
+        return 'morning'
+    if 12 <= hour < 17:
+        return 'afternoon'
+    if 17 <= hour < 22:
+        return 'evening'
+    return 'late night'
+
+def _build_profile(user_id, rows, today):
+    """Summarize (day, mode, sessions, completed, hour) rows for one user"""
+    sessions = sum(row[2] for row in rows)
+    completed = sum(row[3] or 0 for row in rows)
+    modes = Counter()
+    times_of_day = Counter()
+    for day, mode, count, _, hour in rows:
+        modes[mode] += count
+        # Bucketed per session rather than averaged, so 23:00 and 01:00 stay "late night"
+        times_of_day[_time_of_day(hour)] += count
+
+    # Consecutive days with a completed session, ending today or yesterday
+    active_days = {row[0] for row in rows if row[3]}
+    day = today if today.isoformat() in active_days else today - timedelta(days=1)
+    streak = 0
+    while day.isoformat() in active_days:
+        streak += 1
+        day -= timedelta(days=1)
+
+    return {
+        'user_id': user_id,
+        'sessions': sessions,
+        'completion_rate': completed / sessions,
+        'preferred_mode': modes.most_common(1)[0][0],
+        'time_of_day': times_of_day.most_common(1)[0][0],
+        'streak_days': streak,
+    }
+
+def stream_user_profiles(window_days=ACTIVITY_WINDOW_DAYS, chunk_size=PROFILE_CHUNK_SIZE):
+    """Yield a study pattern profile for every user with recent sessions.
+
+    Users are read in chunks of chunk_size with keyset pagination, and each
+    chunk's connection is closed before its profiles are handed out, so
+    callers can write to the database between chunks.
+    """
+    since = datetime.now() - timedelta(days=window_days)
+    today = datetime.now().date()
+    last_user_id = 0
+
+    while True:
+        conn = sqlite3.connect(get_db_path())
+        c = conn.cursor()
+        c.execute(QUERIES['active_user_ids'], (last_user_id, since, chunk_size))
+        user_ids = [row[0] for row in c.fetchall()]
+        if not user_ids:
+            conn.close()
+            return
+
+        c.execute(QUERIES['user_activity_by_day'], (user_ids[0], user_ids[-1], since))
+        rows = c.fetchall()
+        conn.close()
+
+        for user_id, user_rows in groupby(rows, key=lambda row: row[0]):
+            yield _build_profile(user_id, [row[1:] for row in user_rows], today)
+        last_user_id = user_ids[-1]
+
+def _describe(profile):
+    mode = {'focus': 'focus mode', 'deep': 'deep work'}.get(profile['preferred_mode'], 'custom intervals')
+    return (
+        f"prefers {mode}, usually studies in the {profile['time_of_day']}, "
+        f"completes {round(profile['completion_rate'] * 100)}% of {profile['sessions']} recent sessions, "
+        f"{profile['streak_days']}-day streak"
+    )
+
+def request_batch_tips(profiles):
+    """Ask for TIPS_PER_USER tips for every profile in one chat completion call"""
+    students = "\n".join(f"{i}: {_describe(profile)}" for i, profile in enumerate(profiles))
+    prompt = (
+        f"Write {TIPS_PER_USER} short, motivational study tips for each student below, "
+        "personalised to their study habits. Reply with only a JSON object mapping each "
+        f"student number to a list of tips.\n\n{students}"
+    )
+
+    response = requests.post(
+        f"{A4F_API_URL}/chat/completions",
+        headers={"Authorization": f"Bearer {A4F_API_KEY}"},
+        json={
+            "messages": [{"role": "user", "content": prompt}],
+            "model": "gpt-3.5-turbo"
+        },
+        timeout=TIP_REQUEST_TIMEOUT
+    )
+    content = response.json()["choices"][0]["message"]["content"]
+    # Models sometimes wrap the JSON in prose or code fences
+    tips = json.loads(content[content.index('{'):content.rindex('}') + 1])
+
+    tips_by_user = {}
+    for key, user_tips in tips.items():
+        if str(key).isdigit() and int(key) < len(profiles) and isinstance(user_tips, list):
+            cleaned = [str(tip).strip() for tip in user_tips if str(tip).strip()]
+            if cleaned:
+                tips_by_user[profiles[int(key)]['user_id']] = cleaned[:TIPS_PER_USER]
+    return tips_by_user
+
+def store_tips(tips_by_user):
+    now = datetime.now()
+    conn = sqlite3.connect(get_db_path())
+    c = conn.cursor()
+    c.executemany(QUERIES['upsert_user_tip'], [
+        (user_id, slot, tip, now)
+        for user_id, tips in tips_by_user.items()
+        for slot, tip in enumerate(tips)
+    ])
+    # Drop slots left over from a previous run that returned more tips
+    c.executemany(
+        QUERIES['trim_user_tips'],
+        [(user_id, len(tips)) for user_id, tips in tips_by_user.items()]
+    )
+    conn.commit()
+    conn.close()
+
+def precompute_tips(batch_size=TIP_BATCH_SIZE):
+    """Refresh personalized tips for all recently active users, one API call per batch"""
+    batch = []
+    batches = users = 0
+
+    def flush():
+        nonlocal batches, users
+        batches += 1
+        try:
+            tips_by_user = request_batch_tips(batch)
+        except Exception as e:
+            logger.error(f"Tip batch {batches} failed: {str(e)}")
+            return
+        store_tips(tips_by_user)
+        users += len(tips_by_user)
+
+    for profile in stream_user_profiles():
+        batch.append(profile)
+        if len(batch) >= batch_size:
+            flush()
+            batch = []
+    if batch:
+        flush()
+
+    logger.info(f"Precomputed tips for {users} users in {batches} batches")
+
+def get_precomputed_tip(user_id, session_id):
+    """Pick one of the user's stored tips, rotating by session id"""
+    conn = sqlite3.connect(get_db_path())
+    c = conn.cursor()
+    c.execute(QUERIES['user_tip'], (user_id, session_id % TIPS_PER_USER))
+    row = c.fetchone()
+    conn.close()
+    return row[0] if row else None
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    precompute_tips()
@@ -0,0 +1,142 @@
+import asyncio
+import hashlib
+import logging
+import os
+import threading
+import time
+import edge_tts
+
+logger = logging.getLogger(__name__)
+
+TTS_MAX_CONCURRENCY = int(os.getenv('TTS_MAX_CONCURRENCY', '2'))
+TTS_JOB_TIMEOUT = float(os.getenv('TTS_JOB_TIMEOUT', '15'))
+TTS_BATCH_SIZE = int(os.getenv('TTS_BATCH_SIZE', '8'))
+# Synthesized clips older than this are deleted by prune_tts_files
+TTS_MAX_AGE_DAYS = 7
+TTS_CACHE_MAX_AGE = TTS_MAX_AGE_DAYS * 24 * 3600
+
+def get_tts_dir():
+    if os.getenv('SMARTSTUDY_TTS_DIR'):
+        return os.getenv('SMARTSTUDY_TTS_DIR')
+    if os.name=='posix':
+        return '/tmp/SmartStudyTTS'
+    return 'tts'
+
+def tts_filename(text):
+    """Clips are named by a hash of their text, so each text gets its own file"""
+    return f"{hashlib.sha256(text.encode('utf-8')).hexdigest()[:32]}.mp3"
+
+def tts_output_path(text):
+    os.makedirs(get_tts_dir(), exist_ok=True)
+    return os.path.join(get_tts_dir(), tts_filename(text))
+
+def prune_tts_files(max_age_days=TTS_MAX_AGE_DAYS):
+    """Delete clips not rewritten for max_age_days"""
+    tts_dir = get_tts_dir()
+    if not os.path.isdir(tts_dir):
+        return
+    cutoff = time.time() - max_age_days * 86400
+    pruned = 0
+    for name in os.listdir(tts_dir):
+        path = os.path.join(tts_dir, name)
+        if name.endswith('.mp3') and os.path.getmtime(path) < cutoff:
+            os.remove(path)
+            pruned += 1
+    logger.info(f"Pruned {pruned} TTS clips")
+
+async def text_to_speech(text, output_path):
+    """Synthesize text to an mp3, swapping it into place once fully written"""
+    tmp_path = f"{output_path}.tmp"
+    communicate = edge_tts.Communicate(text)
+    await communicate.save(tmp_path)
+    os.replace(tmp_path, output_path)
+
+class TTSWorker:
+    """Long-lived asyncio loop thread that runs edge-tts jobs for sync callers.
+
+    Jobs are queued from any thread with submit(), which returns a
+    concurrent.futures.Future resolving to the output path. Queued jobs are
+    drained in batches; jobs in a batch with the same text and output file
+    are collapsed into one synthesis.
+    """
+
+    def __init__(self, max_concurrency=TTS_MAX_CONCURRENCY, job_timeout=TTS_JOB_TIMEOUT,
+                 batch_size=TTS_BATCH_SIZE):
+        self.max_concurrency = max_concurrency
+        self.job_timeout = job_timeout
+        self.batch_size = batch_size
+        self._loop = None
+        self._thread = None
+        self._queue = None
+        self._semaphore = None
+        self._dispatcher = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._loop = asyncio.new_event_loop()
+            ready = threading.Event()
+            self._thread = threading.Thread(target=self._run, args=(ready,), name='tts-loop', daemon=True)
+            self._thread.start()
+            ready.wait()
+
+    def shutdown(self):
+        with self._lock:
+            if not (self._thread and self._thread.is_alive()):
+                return
+            self._loop.call_soon_threadsafe(self._dispatcher.cancel)
+            self._thread.join()
+            self._loop.close()
+            self._thread = None
+
+    def submit(self, text, output_path):
+        """Queue a TTS job and return a future for its completion"""
+        self.start()
+        return asyncio.run_coroutine_threadsafe(self._enqueue(text, output_path), self._loop)
+
+    def _run(self, ready):
+        asyncio.set_event_loop(self._loop)
+        self._queue = asyncio.Queue()
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._dispatcher = self._loop.create_task(self._dispatch())
+        self._dispatcher.add_done_callback(lambda _: self._loop.stop())
+        self._loop.call_soon(ready.set)
+        self._loop.run_forever()
+
+    async def _enqueue(self, text, output_path):
+        waiter = self._loop.create_future()
+        await self._queue.put((text, output_path, waiter))
+        return await waiter
+
+    async def _dispatch(self):
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self.batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+
+            # Only identical jobs share a synthesis, so no waiter gets another text's audio
+            jobs = {}
+            for text, output_path, waiter in batch:
+                jobs.setdefault((text, output_path), []).append(waiter)
+
+            await asyncio.gather(*(
+                self._run_job(text, output_path, waiters)
+                for (text, output_path), waiters in jobs.items()
+            ))
+
+    async def _run_job(self, text, output_path, waiters):
+        try:
+            async with self._semaphore:
+                await asyncio.wait_for(text_to_speech(text, output_path), self.job_timeout)
+        except Exception as e:
+            logger.error(f"TTS synthesis failed for {output_path}: {str(e)}")
+            for waiter in waiters:
+                if not waiter.done():
+                    waiter.set_exception(e)
+            return
+
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(output_path)